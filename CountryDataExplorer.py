@@ -1,10 +1,13 @@
-import numpy as np
+import time
+import uuid
+
 import streamlit as st
-import pandas as pd
 import util as util
+import instrumentation
 
-
-from data_fetcher import fetch_countries, fetch_indicator_data
+# numpy, pandas, plotly and the fetching modules are imported further down, only once the
+# part of the page that needs them is shown, so a cold start paints the page sooner
+from country_snapshot import load_countries
 from indicator_config import (
     get_economic_indicators,
     get_social_indicators,
@@ -12,35 +15,34 @@ from indicator_config import (
     get_developmental_indicators,
     is_percentage_indicator
 )
-from data_processor import process_indicator_data
-from chart_handler import display_line_chart, display_area_chart, display_bar_chart, display_table
+from chart_handler import display_line_chart, display_area_chart, display_bar_chart, display_table, display_map
 
 
+rerun_start = time.perf_counter()  # used to time the whole script run when metrics are on
+instrumentation.start_metrics_server()
+
 util.page_color()
 
 st.title("Country Data Explorer")
 
 
-countries = fetch_countries()
+countries = load_countries()  # bundled snapshot, so the first paint doesn't wait on the API
 sorted_country_names = sorted(countries.keys())  # this sorts countries by alphabet
-selected_countries = st.multiselect("Select Countries", options=sorted_country_names)
+
+# "All countries" ranks and groups every country at once instead of comparing picked ones
+view = st.radio("View", ["Compare countries", "All countries"], horizontal=True, key='view')
+if view == "Compare countries":
+    selected_countries = st.multiselect("Select Countries", options=sorted_country_names)
+else:
+    selected_countries = []  # skips the comparison section below
+    from aggregation_view import display_aggregations
+    display_aggregations()
 
 if selected_countries:
     world_map = st.checkbox("Display Map", value=True, key='map')  # checkbox for user to display map
-    # used to store longitude and latitude to display the map
-    coordinates = np.zeros((len(selected_countries), 2))  # make distinct 1D arrays for each selected country
 
     if world_map:  # if user selects checkbox
-        for country_index in range(len(selected_countries)):
-            country_name = selected_countries[country_index]
-            country_data = countries[country_name]
-            for j in range(1):
-                coordinates[country_index][j] = country_data['latitude']
-                coordinates[country_index][j+1] = country_data['longitude']
-                # set latitude and longitude for each country into their own 1D arrays
-
-        map_data = pd.DataFrame(coordinates, columns=['latitude', 'longitude'])  # used to display each country on the map as a red dot
-        st.map(map_data)  # displays the map
+        display_map(selected_countries)  # coordinates come from a cached typed table, the map is reused while the selection is unchanged
     else:
         st.session_state.map_display = False
 
@@ -98,25 +100,56 @@ if selected_countries:
         indicator_code = indicator_map[indicator]
         st.session_state.chart_percentage = is_percentage_indicator(indicator_code)
 
-    if indicator_code:
-        indicator_data = fetch_indicator_data(selected_countries, countries_dict=countries, indicator=indicator_code)
-        # a dictionary with country names as keys and data (dates and values)
-
-        df, min_value, max_value, country_count = process_indicator_data(
-            indicator_data,
-            st.session_state.chart_percentage
-        )
+    if selected_category != -1:
+        import prefetch
+        from data_fetcher import get_cube
+
+        # warm the cache for the other indicators of the category, since one of them is the likely next click
+        cube = get_cube()
+        next_indicators = [
+            code for code in indicator_map.values()
+            if code and code != indicator_code and not (cube is not None and cube.has(code, selected_countries))
+        ]
+        prefetch_key = (selected_category, tuple(selected_countries))
+        if st.session_state.get('prefetch_key') != prefetch_key:
+            # only reschedule when the category or countries changed, not on every rerun
+            st.session_state.prefetch_key = prefetch_key
+            session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+            country_ids = [countries[country]['id'] for country in selected_countries]
+            prefetch.prefetch_indicators(session_id, country_ids, next_indicators)
 
+    if indicator_code:
+        import requests
+        from indicator_pipeline import load_indicator_frame, get_data_key, missing_countries
+
+        try:
+            df, min_value, max_value, country_count = load_indicator_frame(selected_countries, countries, indicator_code)
+            # only newly selected countries are fetched, the rest is reused from earlier reruns
+            missing = missing_countries(indicator_code)
+        except requests.RequestException:
+            # the API is unreachable and nothing is cached for the selection
+            df, min_value, max_value, country_count = None, None, None, len(selected_countries)
+            missing = selected_countries
+
+        if missing:
+            # Warning if some countries couldn't be fetched, they are retried on the next rerun
+            st.warning(f"Data for {', '.join(missing)} couldn't be loaded right now, try again in a moment.")
         if max_value is None:
             # Warning if all countries selected contain no data
             # Ex. Afghanistan -> Environmental Factors -> Energy use
-            if country_count == 1:
+            if len(missing) == country_count:
+                pass  # nothing was loaded, which the warning above already says
+            elif country_count == 1:
                 st.warning("This country has no available data for the selected indicator.")
             else:
                 st.warning("These countries have no available data for the selected indicator.")
         else:
             # Plot charts and table
-            display_line_chart(df, min_value, max_value, st.session_state.chart_percentage)
-            display_area_chart(df, min_value, max_value, st.session_state.chart_percentage)
-            display_bar_chart(df, min_value, max_value, st.session_state.chart_percentage)
-            display_table(df)
\ No newline at end of file
+            data_key = get_data_key(indicator_code)  # lets the charts reuse figures built from the same data
+            display_line_chart(df, min_value, max_value, st.session_state.chart_percentage, data_key)
+            display_area_chart(df, min_value, max_value, st.session_state.chart_percentage, data_key)
+            display_bar_chart(df, min_value, max_value, st.session_state.chart_percentage, data_key)
+            display_table(df, st.session_state.chart_percentage)
+
+instrumentation.observe("stage_seconds", time.perf_counter() - rerun_start, stage="rerun")
+instrumentation.display_debug_panel()
\ No newline at end of file
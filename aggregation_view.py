@@ -0,0 +1,152 @@
+"""Module for displaying the all-country aggregate views."""
+import requests
+import streamlit as st
+import plotly.express as px
+
+from aggregations import GROUPINGS, get_panel, group_trend, growth_table, year_summary
+from indicator_config import get_all_indicators, is_percentage_indicator
+
+VIEWS = ["Rankings", "Percentiles", "Regions & income groups", "Growth"]
+
+
+def value_format(is_percentage):
+    """Get the number format of indicator values in tables.
+
+    Args:
+        is_percentage (bool): Whether to display values as percentages.
+
+    Returns:
+        str: printf-style format used by st.column_config.NumberColumn.
+    """
+    return "%.2f%%" if is_percentage else "%,.2f"
+
+
+def display_rankings(summary, year, is_percentage):
+    """Display the top countries of a year as a bar chart and the full ranking as a table.
+
+    Args:
+        summary (dict): Result of aggregations.year_summary.
+        year (int): Year of the summary.
+        is_percentage (bool): Whether to display values as percentages.
+    """
+    ranking = summary["ranking"]
+    top = st.slider("Countries to show", min_value=5, max_value=50, value=20, step=5, key='rank_top')
+    bottom = st.checkbox("Show the lowest values instead", value=False, key='rank_bottom')
+    shown = ranking.tail(top).iloc[::-1] if bottom else ranking.head(top)
+    chart = px.bar(shown, x='Country', y='Value', title=f"{'Bottom' if bottom else 'Top'} {top} in {year}")
+    if is_percentage:
+        chart.update_yaxes(ticksuffix="%")
+    st.plotly_chart(chart)
+    st.dataframe(ranking, hide_index=True, column_config={
+        'Value': st.column_config.NumberColumn(format=value_format(is_percentage)),
+        'Percentile': st.column_config.NumberColumn(format="%.0f")
+    })
+
+
+def display_percentiles(panel, summary, year, is_percentage):
+    """Display the distribution of a year's values and its percentiles.
+
+    Args:
+        panel (aggregations.Panel): Panel of the indicator.
+        summary (dict): Result of aggregations.year_summary.
+        year (int): Year of the summary.
+        is_percentage (bool): Whether to display values as percentages.
+    """
+    ranking = summary["ranking"]
+    st.write(f"{len(ranking)} of {len(panel.names)} countries have data in {year}.")
+    chart = px.histogram(ranking, x='Value', nbins=40, hover_data=['Country'])
+    if is_percentage:
+        chart.update_xaxes(ticksuffix="%")
+    st.plotly_chart(chart)
+    st.dataframe(summary["quantiles"], hide_index=True, column_config={
+        'Value': st.column_config.NumberColumn(format=value_format(is_percentage))
+    })
+
+
+def display_groups(indicator, version, summary, year, is_percentage):
+    """Display region or income group rollups of a year and the groups' averages over time.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        version (str): Version of the indicator's panel.
+        summary (dict): Result of aggregations.year_summary.
+        year (int): Year of the summary.
+        is_percentage (bool): Whether to display values as percentages.
+    """
+    by = st.radio("Group by", list(GROUPINGS), format_func=GROUPINGS.get, horizontal=True, key='group_by')
+    groups = summary["groups"][by]
+    value_column = st.column_config.NumberColumn(format=value_format(is_percentage))
+    st.dataframe(groups, hide_index=True, column_config={
+        column: value_column for column in ("Mean", "Median", "Min", "Max", "Total")
+    })
+    chart = px.bar(groups, x=GROUPINGS[by], y='Mean', title=f"Average by {GROUPINGS[by].lower()} in {year}")
+    if is_percentage:
+        chart.update_yaxes(ticksuffix="%")
+    st.plotly_chart(chart)
+
+    trend = group_trend(indicator, by, version).dropna(how='all', subset=list(groups[GROUPINGS[by]]))
+    long_trend = trend.melt(id_vars=['Year'], var_name=GROUPINGS[by], value_name='Mean')
+    chart = px.line(long_trend, x='Year', y='Mean', color=GROUPINGS[by], title="Average over time")
+    chart.update_xaxes(tickformat="d")
+    if is_percentage:
+        chart.update_yaxes(ticksuffix="%")
+    st.plotly_chart(chart)
+
+
+def display_growth(indicator, version, years, is_percentage):
+    """Display every country's compound annual growth rate between two years.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        version (str): Version of the indicator's panel.
+        years (list): Years with data, ascending.
+        is_percentage (bool): Whether the indicator values are percentages.
+    """
+    if len(years) < 2:
+        st.warning("This indicator doesn't have enough years of data to compute growth.")
+        return
+    start_year, end_year = st.select_slider(
+        "Growth between", options=years, value=(years[max(0, len(years) - 11)], years[-1]), key='growth_years'
+    )
+    if start_year == end_year:
+        st.warning("Select two different years.")
+        return
+    growth = growth_table(indicator, start_year, end_year, version)
+    st.dataframe(growth, hide_index=True, column_config={
+        str(start_year): st.column_config.NumberColumn(format=value_format(is_percentage)),
+        str(end_year): st.column_config.NumberColumn(format=value_format(is_percentage)),
+        'Growth (% per year)': st.column_config.NumberColumn(format="%.2f%%")
+    })
+
+
+def display_aggregations():
+    """Display the indicator and year pickers and the selected aggregate view."""
+    indicators = get_all_indicators()
+    indicator = st.selectbox("Select a factor to compare every country on", list(indicators),
+                             format_func=indicators.get, key='aggregate_indicator')
+    is_percentage = is_percentage_indicator(indicator)
+
+    try:
+        with st.spinner("Loading every country's data..."):
+            panel = get_panel(indicator)
+    except requests.RequestException as error:
+        st.error(f"Every country's data couldn't be loaded, try again later ({error}).")
+        return
+    years = [int(year) for year in panel.years_with_data()]
+    if not years:
+        st.warning("No country has data for the selected indicator.")
+        return
+
+    view = st.radio("View", VIEWS, horizontal=True, key='aggregate_view')
+    if view == "Growth":
+        display_growth(indicator, panel.version, years, is_percentage)
+        return
+
+    year = st.select_slider("Year", options=years, value=years[-1], key='aggregate_year')
+    summary = year_summary(indicator, year, panel.version)  # the version makes a new ingestion recompute it
+    if view == "Rankings":
+        display_rankings(summary, year, is_percentage)
+    elif view == "Percentiles":
+        display_percentiles(panel, summary, year, is_percentage)
+    else:
+        display_groups(indicator, panel.version, summary, year, is_percentage)
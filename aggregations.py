@@ -0,0 +1,287 @@
+"""Module for aggregating an indicator over every country at once.
+
+An indicator is loaded once as a Country x Year panel of all countries (from the shared
+cube when the indicator was preloaded, otherwise through the cache and the API), with each
+country's region and income level encoded as integer group codes. Rankings, percentiles,
+group rollups and growth rates are then computed with NumPy over the whole panel
+(argsort, nanquantile, bincount, reduceat) instead of looping over countries, and their
+results are cached per (indicator, year).
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import indicator_cache
+from data_fetcher import fetch_countries, fetch_indicator_data, get_cube, get_store_version
+from data_processor import build_year_matrix
+from instrumentation import timed
+
+GROUPINGS = {"region": "Region", "income_level": "Income level"}  # country metadata keys -> column labels
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+UNKNOWN_GROUP = "Unknown"  # countries without metadata, e.g. from a store ingested before it was kept
+
+
+class Panel:
+    """Values of one indicator for every country and year, with the countries' group codes."""
+
+    def __init__(self, values, years, names, countries, version=None):
+        """Create a panel and encode the countries' groups.
+
+        Args:
+            values (np.ndarray): Float64 array of shape (country, year), NaN for missing data.
+            years (np.ndarray): Sorted years of the columns.
+            names (list): Country names of the rows.
+            countries (dict): Countries as returned by fetch_countries.
+            version (str): Version of the preloaded store the panel was built with.
+        """
+        self.version = version
+        self.values = np.asarray(values, dtype=np.float64)
+        self.years = np.asarray(years, dtype=np.int64)
+        self.names = np.asarray(names, dtype=object)
+        self.year_index = {int(year): i for i, year in enumerate(self.years)}
+        self.groups = {}  # grouping -> (labels, code of every country)
+        for by in GROUPINGS:
+            labels = [countries.get(name, {}).get(by) or UNKNOWN_GROUP for name in names]
+            self.groups[by] = np.unique(np.array(labels, dtype=str), return_inverse=True)
+
+    def years_with_data(self):
+        """Get the years where at least one country has a value.
+
+        Returns:
+            np.ndarray: Sorted years.
+        """
+        return self.years[(~np.isnan(self.values)).any(axis=0)]
+
+    def column(self, year):
+        """Get every country's value in a year.
+
+        Args:
+            year (int): Year to read.
+
+        Returns:
+            np.ndarray: One value per country, all NaN if the panel doesn't cover the year.
+        """
+        if year not in self.year_index:
+            return np.full(len(self.names), np.nan)
+        return self.values[:, self.year_index[year]]
+
+    def rank(self, year, ascending=False):
+        """Rank the countries with a value in a year.
+
+        Args:
+            year (int): Year to rank.
+            ascending (bool): Rank the smallest value first instead of the largest.
+
+        Returns:
+            pd.DataFrame: "Rank", "Country", "Value" and "Percentile" columns, best first.
+                Percentile is the share of countries with a value at or below the country's.
+        """
+        column = self.column(year)
+        valid = np.flatnonzero(~np.isnan(column))
+        values = column[valid]
+        order = np.argsort(values if ascending else -values, kind="stable")
+        ordered = values[order]
+        sorted_values = np.sort(values)
+        percentile = np.searchsorted(sorted_values, ordered, side="right") / max(len(values), 1) * 100
+        return pd.DataFrame({
+            "Rank": np.arange(1, len(order) + 1),
+            "Country": self.names[valid[order]],
+            "Value": ordered,
+            "Percentile": percentile
+        })
+
+    def quantiles(self, year, quantiles=QUANTILES):
+        """Compute quantiles of the countries' values in a year.
+
+        Args:
+            year (int): Year to summarize.
+            quantiles (tuple): Quantiles between 0 and 1.
+
+        Returns:
+            pd.DataFrame: "Percentile" and "Value" columns, empty if no country has a value.
+        """
+        column = self.column(year)
+        column = column[~np.isnan(column)]
+        if len(column) == 0:
+            return pd.DataFrame({"Percentile": [], "Value": []})
+        return pd.DataFrame({
+            "Percentile": [f"p{round(q * 100)}" for q in quantiles],
+            "Value": np.quantile(column, quantiles)
+        })
+
+    def group_by(self, year, by):
+        """Roll the countries' values in a year up by region or income level.
+
+        Countries are sorted by (group, value) once, so counts and sums come from bincount
+        and min, median and max are read at each group's segment boundaries.
+
+        Args:
+            year (int): Year to summarize.
+            by (str): Key of GROUPINGS.
+
+        Returns:
+            pd.DataFrame: One row per group with data: the group label, "Countries", "Mean",
+                "Median", "Min", "Max" and "Total".
+        """
+        labels, codes = self.groups[by]
+        column = self.column(year)
+        valid = ~np.isnan(column)
+        codes = codes[valid]
+        values = column[valid]
+
+        order = np.lexsort((values, codes))
+        codes = codes[order]
+        values = values[order]
+        counts = np.bincount(codes, minlength=len(labels))
+        totals = np.bincount(codes, weights=values, minlength=len(labels))
+        present = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+        sizes = counts[present]
+        medians = (values[starts + (sizes - 1) // 2] + values[starts + sizes // 2]) / 2
+        return pd.DataFrame({
+            GROUPINGS[by]: labels[present],
+            "Countries": sizes,
+            "Mean": totals[present] / sizes,
+            "Median": medians,
+            "Min": values[starts],
+            "Max": values[starts + sizes - 1],
+            "Total": totals[present]
+        })
+
+    def group_trend(self, by):
+        """Average the countries' values by region or income level for every year at once.
+
+        Args:
+            by (str): Key of GROUPINGS.
+
+        Returns:
+            pd.DataFrame: "Year" column plus one column of yearly means per group.
+        """
+        labels, codes = self.groups[by]
+        year_count = len(self.years)
+        valid = ~np.isnan(self.values)
+        # one bin per (group, year) pair, so a single bincount covers the whole panel
+        bins = (codes[:, None] * year_count + np.arange(year_count))[valid]
+        size = len(labels) * year_count
+        counts = np.bincount(bins, minlength=size).reshape(len(labels), year_count)
+        totals = np.bincount(bins, weights=self.values[valid], minlength=size).reshape(len(labels), year_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = totals / counts  # NaN where a group has no value in a year
+        df = pd.DataFrame(means.T, columns=list(labels))
+        df.insert(0, "Year", self.years)
+        return df
+
+    def growth(self, start_year, end_year):
+        """Compute every country's compound annual growth rate between two years.
+
+        Args:
+            start_year (int): First year.
+            end_year (int): Last year, after start_year.
+
+        Returns:
+            pd.DataFrame: "Country", start value, end value and "Growth (% per year)" columns,
+                fastest growing first. Countries missing either value or starting at or below
+                zero are left out.
+        """
+        start = self.column(start_year)
+        end = self.column(end_year)
+        valid = np.flatnonzero(~np.isnan(start) & ~np.isnan(end) & (start > 0) & (end >= 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = ((end[valid] / start[valid]) ** (1 / (end_year - start_year)) - 1) * 100
+        order = np.argsort(-rate, kind="stable")
+        return pd.DataFrame({
+            "Country": self.names[valid[order]],
+            str(start_year): start[valid[order]],
+            str(end_year): end[valid[order]],
+            "Growth (% per year)": rate[order]
+        })
+
+
+def get_panel(indicator):
+    """Load an indicator for every country, once per process and version of the preloaded store.
+
+    Args:
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        Panel: Panel of all countries, shared read-only by every session.
+    """
+    return load_panel(indicator, get_store_version())
+
+
+@st.cache_resource(ttl=indicator_cache.CACHE_TTL)
+@timed("load_panel")
+def load_panel(indicator, version):
+    """Load an indicator for every country.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        version (str): Version of the preloaded store, so a new ingestion builds a new panel.
+
+    Returns:
+        Panel: Panel of all countries.
+    """
+    countries = fetch_countries()
+    cube = get_cube()
+    if cube is not None and cube.has(indicator, countries):
+        rows = cube.values[cube.indicator_index[indicator]]
+        return Panel(rows, cube.years, list(cube.country_index), countries, version)
+
+    names = list(countries)
+    # batched and cached on disk; a partial panel would be cached as if complete, so gaps raise instead
+    indicator_data = fetch_indicator_data(names, countries, indicator, require_all=True)
+    years, matrix = build_year_matrix(indicator_data)
+    return Panel(matrix.T, years, names, countries, version)
+
+
+@st.cache_data(ttl=indicator_cache.CACHE_TTL)
+@timed("year_summary")
+def year_summary(indicator, year, version=None):
+    """Compute the ranking, percentiles and group rollups of an indicator in one year.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        year (int): Year to summarize.
+        version (str): Version of the panel (Panel.version), part of the cache key.
+
+    Returns:
+        dict: "ranking" and "quantiles" dataframes, and "groups" mapping every key of
+            GROUPINGS to its rollup dataframe.
+    """
+    panel = get_panel(indicator)
+    return {
+        "ranking": panel.rank(year),
+        "quantiles": panel.quantiles(year),
+        "groups": {by: panel.group_by(year, by) for by in GROUPINGS}
+    }
+
+
+@st.cache_data(ttl=indicator_cache.CACHE_TTL)
+def group_trend(indicator, by, version=None):
+    """Compute the yearly group means of an indicator.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        by (str): Key of GROUPINGS.
+        version (str): Version of the panel (Panel.version), part of the cache key.
+
+    Returns:
+        pd.DataFrame: See Panel.group_trend.
+    """
+    return get_panel(indicator).group_trend(by)
+
+
+@st.cache_data(ttl=indicator_cache.CACHE_TTL)
+def growth_table(indicator, start_year, end_year, version=None):
+    """Compute every country's growth rate of an indicator between two years.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        start_year (int): First year.
+        end_year (int): Last year.
+        version (str): Version of the panel (Panel.version), part of the cache key.
+
+    Returns:
+        pd.DataFrame: See Panel.growth.
+    """
+    return get_panel(indicator).growth(start_year, end_year)
@@ -0,0 +1,378 @@
+"""Local stand-in for the World Bank v2 API used by the benchmarks.
+
+The server answers the two endpoints the app uses:
+
+* /v2/country?format=json&per_page=N&page=P
+* /v2/country/{id;id;...}/indicator/{code}?format=json&per_page=N&page=P
+
+Responses are built from recorded JSON fixtures (see record_fixtures) when they exist in the
+fixture directory, and from deterministic synthetic data otherwise. Latency, the page size
+limit and error injection are configurable, and every response carries an ETag so
+conditional revalidation can be measured too.
+
+Usage:
+    python benchmarks/fake_worldbank.py [--port PORT] [--latency SECONDS] [--error-rate RATE]
+    python benchmarks/fake_worldbank.py --record [--fixtures DIR]
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import string
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIRST_YEAR = 1960
+LAST_YEAR = 2023
+SYNTHETIC_COUNTRY_COUNT = 217
+REGIONS = [
+    ("EAS", "East Asia & Pacific"), ("ECS", "Europe & Central Asia"), ("LCN", "Latin America & Caribbean"),
+    ("MEA", "Middle East & North Africa"), ("NAC", "North America"), ("SAS", "South Asia"),
+    ("SSF", "Sub-Saharan Africa")
+]
+INCOME_LEVELS = [("HIC", "High income"), ("UMC", "Upper middle income"), ("LMC", "Lower middle income"), ("LIC", "Low income")]
+
+
+def synthetic_countries():
+    """Build a deterministic country list shaped like the /country endpoint's rows.
+
+    A few aggregates (region id "NA") are included so the app's filtering is exercised.
+
+    Returns:
+        list: Country rows.
+    """
+    rng = random.Random(0)
+    rows = []
+    letters = string.ascii_uppercase
+    for i in range(SYNTHETIC_COUNTRY_COUNT):
+        country_id = letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+        region_id, region_name = REGIONS[i % len(REGIONS)]
+        income_id, income_name = INCOME_LEVELS[i % len(INCOME_LEVELS)]
+        rows.append({
+            "id": country_id,
+            "iso2Code": country_id[1:],
+            "name": f"Country {country_id}",
+            "region": {"id": region_id, "iso2code": region_id[:2], "value": region_name},
+            "incomeLevel": {"id": income_id, "iso2code": income_id[:2], "value": income_name},
+            "capitalCity": f"Capital {country_id}",
+            "longitude": f"{rng.uniform(-180, 180):.4f}",
+            "latitude": f"{rng.uniform(-60, 70):.4f}"
+        })
+    for aggregate_id, aggregate_name in [("WLD", "World"), ("EUU", "European Union"), ("ARB", "Arab World")]:
+        rows.append({
+            "id": aggregate_id,
+            "iso2Code": aggregate_id[:2],
+            "name": aggregate_name,
+            "region": {"id": "NA", "iso2code": "NA", "value": "Aggregates"},
+            "incomeLevel": {"id": "NA", "iso2code": "NA", "value": "Aggregates"},
+            "capitalCity": "",
+            "longitude": "",
+            "latitude": ""
+        })
+    return rows
+
+
+def synthetic_indicator_rows(indicator, countries):
+    """Build deterministic indicator rows for every country, newest year first like the API.
+
+    Each series is a random walk that starts at a random year, so the data has the leading
+    missing values real indicators have.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        countries (list): Country rows.
+
+    Returns:
+        list: Indicator rows, grouped by country.
+    """
+    rng = random.Random(indicator)
+    is_percentage = indicator.endswith(".ZS") or indicator.endswith(".ZG")
+    rows = []
+    for country in countries:
+        start_year = rng.choice([FIRST_YEAR, FIRST_YEAR, 1970, 1990, 2000, LAST_YEAR + 1])  # LAST_YEAR + 1 means no data
+        value = rng.uniform(1, 90) if is_percentage else math.exp(rng.uniform(5, 25))
+        series = []
+        for year in range(FIRST_YEAR, LAST_YEAR + 1):
+            if year < start_year:
+                series.append(None)
+                continue
+            value = min(max(value + rng.gauss(0, 1.5), 0), 100) if is_percentage else value * math.exp(rng.gauss(0.02, 0.05))
+            series.append(round(value, 4))
+        for year, year_value in zip(reversed(range(FIRST_YEAR, LAST_YEAR + 1)), reversed(series), strict=True):
+            rows.append({
+                "indicator": {"id": indicator, "value": indicator},
+                "country": {"id": country["iso2Code"], "value": country["name"]},
+                "countryiso3code": country["id"],
+                "date": str(year),
+                "value": year_value,
+                "unit": "",
+                "obs_status": "",
+                "decimal": 1
+            })
+    return rows
+
+
+class FakeWorldBank:
+    """Dataset and settings shared by every request handler thread."""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, latency=0.0, jitter=0.0, max_per_page=None, error_rate=0.0, seed=0):
+        """Create the fake API.
+
+        Args:
+            fixture_dir (str): Directory with recorded fixtures (countries.json, <indicator>.json).
+            latency (float): Seconds to wait before answering each request.
+            jitter (float): Random extra latency of up to this many seconds.
+            max_per_page (int): Cap on the page size, to force pagination.
+            error_rate (float): Share of requests answered with a 503 instead of data.
+            seed (int): Seed of the latency jitter and error injection.
+        """
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.max_per_page = max_per_page
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.countries = self.load_fixture("countries") or synthetic_countries()
+        self.indicator_rows = {}
+        self.stats = {"requests": 0, "bytes": 0, "errors": 0, "not_modified": 0}
+
+    def load_fixture(self, name):
+        """Load a recorded fixture.
+
+        Args:
+            name (str): Fixture name (file name without .json).
+
+        Returns:
+            list: The recorded rows, or None if there is no such fixture.
+        """
+        path = os.path.join(self.fixture_dir, f"{name}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def rows_for(self, indicator):
+        """Get every row of an indicator, loading or synthesizing it on first use.
+
+        Args:
+            indicator (str): World Bank indicator code.
+
+        Returns:
+            list: Indicator rows for every country.
+        """
+        with self.lock:
+            if indicator not in self.indicator_rows:
+                rows = self.load_fixture(indicator)
+                if rows is None:
+                    rows = synthetic_indicator_rows(indicator, [c for c in self.countries if c["region"]["id"] != "NA"])
+                self.indicator_rows[indicator] = rows
+            return self.indicator_rows[indicator]
+
+    def record(self, **changes):
+        """Add to the request counters.
+
+        Args:
+            **changes: Counter names and the amounts to add.
+        """
+        with self.lock:
+            for name, amount in changes.items():
+                self.stats[name] += amount
+
+    def reset_stats(self):
+        """Reset the request counters.
+
+        Returns:
+            dict: The counters before the reset.
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            for name in self.stats:
+                self.stats[name] = 0
+            return stats
+
+    def should_fail(self):
+        """Decide if the current request gets an injected error.
+
+        Returns:
+            bool: True if the request should be answered with a 503.
+        """
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def delay(self):
+        """Get the latency of the current request.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        with self.lock:
+            return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+
+def paginate(rows, query, max_per_page):
+    """Cut rows into the requested page and build the API's metadata object.
+
+    Args:
+        rows (list): Every row of the response.
+        query (dict): Parsed query string.
+        max_per_page (int): Cap on the page size, or None.
+
+    Returns:
+        list: The response body ([metadata, rows]), rows being None when there are none.
+    """
+    per_page = int(query.get("per_page", ["50"])[0])
+    if max_per_page:
+        per_page = min(per_page, max_per_page)
+    page = int(query.get("page", ["1"])[0])
+    total = len(rows)
+    pages = math.ceil(total / per_page) if total else 0
+    page_rows = rows[(page - 1) * per_page:page * per_page]
+    metadata = {"page": page, "pages": pages, "per_page": per_page, "total": total,
+                "sourceid": "2", "lastupdated": "2024-01-01"}
+    return [metadata, page_rows or None]
+
+
+class FakeWorldBankHandler(BaseHTTPRequestHandler):
+    """Request handler answering World Bank v2 API paths from the server's dataset."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        """Answer a GET request."""
+        api = self.server.api
+        time.sleep(api.delay())
+        if api.should_fail():
+            api.record(requests=1, errors=1)
+            self.send_body(503, b'{"message": "injected error"}')
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        if parts[:2] == ["v2", "country"] and len(parts) == 2:
+            rows = api.countries
+        elif len(parts) == 5 and parts[:2] == ["v2", "country"] and parts[3] == "indicator":
+            requested = set(parts[2].split(";"))
+            rows = [row for row in api.rows_for(parts[4]) if row["countryiso3code"] in requested]
+        else:
+            api.record(requests=1)
+            self.send_body(404, b'{"message": "unknown path"}')
+            return
+
+        body = json.dumps(paginate(rows, query, api.max_per_page)).encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            api.record(requests=1, not_modified=1)
+            self.send_body(304, b"", etag=etag)
+            return
+        api.record(requests=1, bytes=len(body))
+        self.send_body(200, body, etag=etag)
+
+    def send_body(self, status, body, etag=None):
+        """Send a JSON response.
+
+        Args:
+            status (int): HTTP status code.
+            body (bytes): Response body.
+            etag (str): ETag header value, if any.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Silence the per-request log lines."""
+
+
+def start_server(api, host="127.0.0.1", port=0):
+    """Start the fake API on a background thread.
+
+    Args:
+        api (FakeWorldBank): Dataset and settings to serve.
+        host (str): Interface to listen on.
+        port (int): Port to listen on, 0 picks a free one.
+
+    Returns:
+        tuple: (server, base_url) where base_url is the value for WORLD_BANK_API_URL.
+    """
+    server = ThreadingHTTPServer((host, port), FakeWorldBankHandler)
+    server.daemon_threads = True
+    server.api = api
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v2"
+
+
+def record_fixtures(indicators, fixture_dir=FIXTURE_DIR, base_url="https://api.worldbank.org/v2"):
+    """Record live API responses as fixtures for the fake API.
+
+    Args:
+        indicators (list): Indicator codes to record.
+        fixture_dir (str): Directory the fixtures are written to.
+        base_url (str): Base URL of the live API.
+    """
+    import requests
+
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    def fetch_all(url):
+        rows = []
+        page = 1
+        while True:
+            data = requests.get(f"{url}&page={page}", timeout=60).json()
+            rows.extend(data[1] or [])
+            if page >= int(data[0].get("pages") or 1):
+                return rows
+            page += 1
+
+    fixtures = {"countries": fetch_all(f"{base_url}/country?format=json&per_page=1000")}
+    for indicator in indicators:
+        fixtures[indicator] = fetch_all(f"{base_url}/country/all/indicator/{indicator}?format=json&per_page=20000")
+    for name, rows in fixtures.items():
+        with open(os.path.join(fixture_dir, f"{name}.json"), "w", encoding="utf-8") as file:
+            json.dump(rows, file)
+        print(f"Recorded {len(rows)} rows to {name}.json")
+
+
+def main():
+    """Parse the command line and serve the fake API (or record fixtures)."""
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the World Bank v2 API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="directory of recorded fixtures")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, in seconds")
+    parser.add_argument("--max-per-page", type=int, default=None, help="cap on the page size, forces pagination")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--record", action="store_true", help="record fixtures from the live API and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        sys.path.insert(0, REPO_ROOT)
+        from indicator_config import get_all_indicators
+        record_fixtures(list(get_all_indicators()), fixture_dir=args.fixtures)
+        return
+
+    api = FakeWorldBank(fixture_dir=args.fixtures, latency=args.latency, jitter=args.jitter,
+                        max_per_page=args.max_per_page, error_rate=args.error_rate)
+    server, base_url = start_server(api, port=args.port)
+    print(f"Serving the fake World Bank API at {base_url} (set WORLD_BANK_API_URL to use it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Startup profile of the dashboard: import time breakdown and first paint.
+
+Runs the app in a fresh Python process under -X importtime, through Streamlit's AppTest
+harness (no browser), against the fake World Bank API. Each phase is timed and every
+import is attributed to the phase that triggered it:
+
+* import_streamlit: importing Streamlit itself,
+* first_paint: the first script run (title, view switch and country picker),
+* first_selection: the run after selecting a country (map and category buttons),
+* first_category: the run after clicking the first category button,
+* first_indicator: the run after picking its first indicator (fetch, table building),
+* rerun: the same script run again, with everything imported and cached.
+
+Usage:
+    python benchmarks/profile_startup.py [--output startup_report.json] [--no-snapshot]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from fake_worldbank import REPO_ROOT, FakeWorldBank, start_server
+
+APP_PATH = os.path.join(REPO_ROOT, "CountryDataExplorer.py")
+PHASE_MARKER = "startup-profile-phase:"
+
+
+def mark(phase):
+    """Tell the parent process which phase the following imports belong to.
+
+    The marker goes to stderr, where -X importtime writes, so the two stay in order.
+
+    Args:
+        phase (str): Name of the phase that starts.
+    """
+    print(f"{PHASE_MARKER}{phase}", file=sys.stderr, flush=True)
+
+
+def run_child():
+    """Run the app phase by phase and print the wall time of every phase as JSON."""
+    timings = {}
+
+    mark("import_streamlit")
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    timings["import_streamlit"] = time.perf_counter() - start
+
+    sys.path.insert(0, REPO_ROOT)  # the app imports its modules from the repository root
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    steps = [
+        ("first_paint", lambda: app.run()),
+        ("first_selection", lambda: app.multiselect[0].select(app.multiselect[0].options[0]).run()),
+        ("first_category", lambda: app.button[0].click().run()),
+        ("first_indicator", lambda: app.selectbox[0].select(app.selectbox[0].options[1]).run()),  # options[0] is blank
+        ("rerun", lambda: app.run())
+    ]
+    for phase, step in steps:
+        mark(phase)
+        start = time.perf_counter()
+        step()
+        timings[phase] = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(f"the app raised during {phase}: {app.exception[0].message}")
+    mark("done")
+    print(json.dumps(timings))
+
+
+def parse_importtime(stderr):
+    """Sum the -X importtime output per phase and per top-level package.
+
+    Only the outermost import of every chain is counted, since its cumulative time already
+    includes everything it imported.
+
+    Args:
+        stderr (str): stderr of the child process.
+
+    Returns:
+        dict: Mapping of phase names to {package: cumulative seconds}.
+    """
+    imports = defaultdict(lambda: defaultdict(float))
+    phase = "interpreter"
+    for line in stderr.splitlines():
+        if line.startswith(PHASE_MARKER):
+            phase = line[len(PHASE_MARKER):]
+            continue
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if len(name) - len(name.lstrip()) > 1:
+            continue  # nested import, already counted in its parent's cumulative time
+        imports[phase][name.strip().split(".")[0]] += int(cumulative) / 1e6
+    return imports
+
+
+def profile(use_snapshot=True):
+    """Profile one cold start of the app.
+
+    Args:
+        use_snapshot (bool): Read the country list from a snapshot of the fake API's, or
+            leave it missing to measure the fetching path.
+
+    Returns:
+        dict: Report with the wall time and import breakdown of every phase.
+    """
+    server, base_url = start_server(FakeWorldBank(latency=0.05))
+    work_dir = tempfile.mkdtemp(prefix="countrydata-startup-")
+    env = dict(
+        os.environ,
+        WORLD_BANK_API_URL=base_url,
+        INDICATOR_CACHE_PATH=os.path.join(work_dir, "cache.sqlite"),
+        INDICATOR_STORE_DIR=os.path.join(work_dir, "store"),  # empty, so nothing is preloaded
+        COUNTRYDATA_COUNTRIES_SNAPSHOT=os.path.join(work_dir, "countries.json"),  # never the repo's snapshot
+        PREFETCH_ENABLED="0",  # background fetches would blur the phase timings
+        COUNTRYDATA_OFFLINE="0"
+    )
+    if use_snapshot:
+        # written from the fake API the way a deploy writes it, outside the timed process
+        subprocess.run([sys.executable, os.path.join(REPO_ROOT, "country_snapshot.py")],
+                       cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    server.shutdown()
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(completed.stderr)
+    phases = []
+    for phase, wall in timings.items():
+        packages = sorted(imports.get(phase, {}).items(), key=lambda item: -item[1])
+        phases.append({
+            "phase": phase,
+            "wall_s": wall,
+            "import_s": sum(seconds for _, seconds in packages),
+            "packages": [{"package": package, "import_s": seconds} for package, seconds in packages]
+        })
+    return {"created_at": time.time(), "snapshot": use_snapshot, "phases": phases}
+
+
+def print_report(report, top=8):
+    """Print a report as a table.
+
+    Args:
+        report (dict): Result of profile.
+        top (int): Number of packages listed per phase.
+    """
+    print(f"{'phase':>16} {'wall ms':>9} {'imports ms':>11}  slowest imports")
+    for phase in report["phases"]:
+        packages = ", ".join(f"{p['package']} {p['import_s'] * 1000:.0f}" for p in phase["packages"][:top])
+        print(f"{phase['phase']:>16} {phase['wall_s'] * 1000:9.1f} {phase['import_s'] * 1000:11.1f}  {packages}")
+
+
+def main():
+    """Parse the command line and run the profile."""
+    parser = argparse.ArgumentParser(description="Profile the dashboard's cold start.")
+    parser.add_argument("--output", default="startup_report.json", help="path of the JSON report")
+    parser.add_argument("--no-snapshot", action="store_true", help="fetch the country list instead of reading the snapshot")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child()
+        return
+
+    report = profile(use_snapshot=not args.no_snapshot)
+    print_report(report)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
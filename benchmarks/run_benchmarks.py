@@ -0,0 +1,243 @@
+"""Offline benchmarks of the data pipeline against the fake World Bank API.
+
+Measures the latency, throughput and peak memory of every pipeline stage (country list,
+cold and warm indicator fetches, processing, chart building, all-country aggregations, and
+all of them end to end) across country counts and indicator mixes, and writes the results
+to a JSON report. Pass a previous report with --baseline to fail (exit code 1) when a stage
+got slower than the allowed tolerance, e.g. in CI before a deploy.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output bench_report.json] [--baseline old.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fake_worldbank import REPO_ROOT, FakeWorldBank, start_server
+
+COUNTRY_COUNTS = ["1", "10", "50", "all"]
+CHART_KINDS = ["line", "area", "bar"]
+
+
+def indicator_mixes():
+    """Get the indicator mixes to benchmark.
+
+    Returns:
+        dict: Mapping of mix names to lists of indicator codes.
+    """
+    from indicator_config import get_all_indicators, get_economic_indicators, is_percentage_indicator
+
+    all_indicators = list(get_all_indicators())
+    return {
+        "economic": [code for code in get_economic_indicators().values() if code],
+        "percentage": [code for code in all_indicators if is_percentage_indicator(code)][:4],
+        "all": all_indicators
+    }
+
+
+def measure(function, repeats, api):
+    """Time a function and record its peak memory and API traffic.
+
+    Timing runs and the memory run are separate, since tracemalloc slows allocations down.
+
+    Args:
+        function (callable): Function to measure, called with no arguments.
+        repeats (int): Number of timed runs.
+        api (FakeWorldBank): Fake API whose counters are read.
+
+    Returns:
+        dict: Latency statistics (seconds), peak memory (bytes) and API requests/bytes per run.
+    """
+    timings = []
+    api.reset_stats()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    traffic = api.reset_stats()
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    api.reset_stats()
+
+    timings.sort()
+    return {
+        "median_s": statistics.median(timings),
+        "p95_s": timings[min(len(timings) - 1, round(0.95 * (len(timings) - 1)))],
+        "min_s": timings[0],
+        "mean_s": statistics.fmean(timings),
+        "peak_memory_bytes": peak,
+        "requests": traffic["requests"] / repeats,
+        "bytes": traffic["bytes"] / repeats,
+        "errors": traffic["errors"] / repeats
+    }
+
+
+def run(repeats, country_counts, mixes, api):
+    """Run every benchmark.
+
+    Args:
+        repeats (int): Number of timed runs per measurement.
+        country_counts (list): Country counts to benchmark ("all" for every country).
+        mixes (dict): Mapping of mix names to lists of indicator codes.
+        api (FakeWorldBank): Fake API the pipeline talks to.
+
+    Returns:
+        list: One result dictionary per (mix, country count, stage).
+    """
+    import indicator_cache
+    from aggregations import GROUPINGS, Panel
+    from chart_handler import build_chart, is_heavy, melt_years
+    from data_fetcher import download_countries, fetch_indicator_data
+    from data_processor import build_year_matrix, process_indicator_data
+
+    results = [dict(mix=None, countries=None, stage="countries", **measure(download_countries, repeats, api))]
+    countries = download_countries()
+    names = sorted(countries)
+
+    for mix, indicators in mixes.items():
+        for count in country_counts:
+            selected = names if count == "all" else names[:int(count)]
+
+            def fetch_cold():
+                indicator_cache.clear()
+                return [fetch_indicator_data(selected, countries, indicator) for indicator in indicators]
+
+            def fetch_warm():
+                return [fetch_indicator_data(selected, countries, indicator) for indicator in indicators]
+
+            fetched = fetch_cold()
+
+            def process():
+                return [process_indicator_data(indicator_data) for indicator_data in fetched]
+
+            processed = process()
+
+            def charts():
+                for df, min_value, max_value, _ in processed:
+                    if df is None:
+                        continue
+                    compact = is_heavy(df, min_value, max_value)
+                    long_df = melt_years(df, min_value, max_value, compact)
+                    for kind in CHART_KINDS:
+                        build_chart(kind, long_df, False, compact)
+
+            def end_to_end():
+                for indicator_data in fetch_cold():
+                    df, min_value, max_value, _ = process_indicator_data(indicator_data)
+                    if df is None:
+                        continue
+                    compact = is_heavy(df, min_value, max_value)
+                    long_df = melt_years(df, min_value, max_value, compact)
+                    for kind in CHART_KINDS:
+                        build_chart(kind, long_df, False, compact)
+
+            def aggregate():
+                for indicator_data in fetched:
+                    years, matrix = build_year_matrix(indicator_data)
+                    panel = Panel(matrix.T, years, list(indicator_data), countries)
+                    with_data = panel.years_with_data()
+                    if len(with_data) < 2:
+                        continue
+                    year = int(with_data[-1])
+                    panel.rank(year)
+                    panel.quantiles(year)
+                    for by in GROUPINGS:
+                        panel.group_by(year, by)
+                        panel.group_trend(by)
+                    panel.growth(int(with_data[0]), year)
+
+            stages = [("fetch_cold", fetch_cold), ("fetch_warm", fetch_warm), ("process", process),
+                      ("charts", charts), ("end_to_end", end_to_end)]
+            if count == "all":
+                stages.append(("aggregate", aggregate))  # the aggregate views always cover every country
+            for stage, function in stages:
+                result = dict(mix=mix, countries=len(selected), stage=stage, **measure(function, repeats, api))
+                result["throughput_series_per_s"] = len(selected) * len(indicators) / result["median_s"]
+                results.append(result)
+                print(f"{mix:>10} {len(selected):>4} countries {stage:>10}: {result['median_s'] * 1000:9.1f} ms "
+                      f"(p95 {result['p95_s'] * 1000:.1f} ms, {result['peak_memory_bytes'] / 1e6:.1f} MB peak, "
+                      f"{result['requests']:.0f} requests)")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Find stages that got slower than a baseline report allows.
+
+    Args:
+        results (list): Results of this run.
+        baseline (dict): Previous report.
+        tolerance (float): Allowed slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        list: Descriptions of the regressions.
+    """
+    previous = {(r["mix"], r["countries"], r["stage"]): r["median_s"] for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        key = (result["mix"], result["countries"], result["stage"])
+        if key in previous and result["median_s"] > previous[key] * (1 + tolerance):
+            regressions.append(f"{key}: {previous[key] * 1000:.1f} ms -> {result['median_s'] * 1000:.1f} ms")
+    return regressions
+
+
+def main():
+    """Parse the command line, start the fake API and run the benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline against a fake World Bank API.")
+    parser.add_argument("--output", default="bench_report.json", help="path of the JSON report")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per measurement")
+    parser.add_argument("--countries", nargs="+", default=COUNTRY_COUNTS, help="country counts, 'all' for every country")
+    parser.add_argument("--mixes", nargs="+", default=None, help="indicator mixes to run (default: all of them)")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every API response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, in seconds")
+    parser.add_argument("--max-per-page", type=int, default=None, help="cap on the API page size, forces pagination")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of API requests answered with a 503")
+    parser.add_argument("--baseline", default=None, help="previous report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    api = FakeWorldBank(latency=args.latency, jitter=args.jitter, max_per_page=args.max_per_page,
+                        error_rate=args.error_rate)
+    server, base_url = start_server(api)
+    work_dir = tempfile.mkdtemp(prefix="countrydata-bench-")
+    # the app modules read their settings at import time, so they are set before importing them
+    os.environ["WORLD_BANK_API_URL"] = base_url
+    os.environ["INDICATOR_CACHE_PATH"] = os.path.join(work_dir, "cache.sqlite")
+    os.environ["INDICATOR_STORE_DIR"] = os.path.join(work_dir, "store")  # empty, so nothing is preloaded
+    os.environ["COUNTRYDATA_COUNTRIES_SNAPSHOT"] = os.path.join(work_dir, "countries.json")  # missing, the list comes from the fake API
+    os.environ["COUNTRYDATA_OFFLINE"] = "0"
+    sys.path.insert(0, REPO_ROOT)
+
+    mixes = indicator_mixes()
+    if args.mixes:
+        mixes = {name: mixes[name] for name in args.mixes}
+    results = run(args.repeats, args.countries, mixes, api)
+    server.shutdown()
+
+    report = {
+        "created_at": time.time(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
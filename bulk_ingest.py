@@ -0,0 +1,59 @@
+"""Command line tool that preloads every configured indicator into the columnar store.
+
+Usage:
+    python bulk_ingest.py [--store-dir DIR] [--indicators CODE [CODE ...]]
+
+Once the store is written, the dashboard reads countries and indicator data from it with
+no network calls. Run it again (e.g. from a daily cron job) to refresh the data. The
+bundled country list snapshot is refreshed from the same download.
+"""
+import argparse
+import time
+
+import country_snapshot
+import indicator_store
+from data_fetcher import download_countries, download_series
+from indicator_config import get_all_indicators
+
+
+def ingest(indicators=None, store_dir=None):
+    """Download indicators for every country and write them to the store.
+
+    Args:
+        indicators (list): Indicator codes to ingest, defaults to every configured indicator.
+        store_dir (str): Directory of the store, defaults to indicator_store.STORE_DIR.
+
+    Returns:
+        str: Directory the store was written to.
+    """
+    indicators = indicators or list(get_all_indicators().keys())
+    countries = download_countries()
+    country_ids = [country['id'] for country in countries.values()]
+    print(f"Ingesting {len(indicators)} indicators for {len(country_ids)} countries")
+
+    series_by_indicator = {}
+    for indicator in indicators:
+        start = time.perf_counter()
+        series_by_indicator[indicator] = download_series(country_ids, indicator)
+        print(f"  {indicator}: {time.perf_counter() - start:.1f}s")
+
+    store_dir = indicator_store.write_store(
+        countries, series_by_indicator, indicators, store_dir=store_dir, created_at=time.time()
+    )
+    print(f"Store written to {store_dir}")
+    print(f"Country list snapshot written to {country_snapshot.write_snapshot(countries)}")
+    return store_dir
+
+
+def main():
+    """Parse the command line and run the ingestion."""
+    parser = argparse.ArgumentParser(description="Preload World Bank indicators into the local store.")
+    parser.add_argument("--store-dir", default=None, help="directory of the store (default: %(default)s)")
+    parser.add_argument("--indicators", nargs="+", default=None,
+                        help="indicator codes to ingest (default: every configured indicator)")
+    args = parser.parse_args()
+    ingest(indicators=args.indicators, store_dir=args.store_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,212 @@
-"""Module for handling chart visualizations."""
+"""Module for handling chart visualizations.
+
+Plotly (and the NumPy-based downsampling) is only imported when the first chart is built,
+so starting the app and rendering the page without charts doesn't pay for it.
+"""
+import os
+from collections import OrderedDict
+
 import streamlit as st
-import plotly.express as px
 
+import instrumentation
+from instrumentation import timed
+
+# charts with more points than this are drawn in the lightweight mode (WebGL lines, no markers, numeric years)
+WEBGL_POINT_THRESHOLD = int(os.environ.get("CHART_WEBGL_THRESHOLD", "1500"))
+# in the lightweight mode, line series longer than this are downsampled with LTTB (0 turns decimation off)
+MAX_POINTS_PER_SERIES = int(os.environ.get("CHART_MAX_POINTS_PER_SERIES", "0"))
+
+# melted year ranges kept per session, one per chart is enough when every chart has its own range
+MAX_CACHED_RANGES = 3
 
-def set_slider(df, min_value, max_value, key):
-    """Display a year range slider and filter dataframe.
+PERCENTAGE_HOVER = "Country=%{fullData.name}<br>Year=%{x}<br>Value (%)=%{y:.2f}%<extra></extra>"
+
+
+def year_slider(min_value, max_value, key):
+    """Display a year range slider.
 
     Args:
-        df (pd.DataFrame): Dataframe to filter.
         min_value (int): Minimum year value.
         max_value (int): Maximum year value.
         key: Unique key for the slider widget.
 
     Returns:
-        pd.DataFrame: Filtered dataframe based on year range.
+        tuple: (start_year, end_year) selected by the user.
     """
     year_range = st.slider(" ", min_value=min_value, max_value=max_value, value=(min_value, max_value), key=key)
-    start_year = year_range[0]
-    end_year = year_range[1]
-    filtered_df = df[(df['Year'] >= start_year) & (df['Year'] <= end_year)]
-    return filtered_df
+    return year_range[0], year_range[1]
+
+
+@timed("melt_years")
+def melt_years(df, start_year, end_year, compact=False):
+    """Filter the dataframe to a year range and melt it into long format for plotting.
+
+    Args:
+        df (pd.DataFrame): Dataframe containing the data, sorted by year.
+        start_year (int): First year of the range (inclusive).
+        end_year (int): Last year of the range (inclusive).
+        compact (bool): Keep the years numeric, which Plotly can encode as a typed array
+            instead of one JSON string per point.
+
+    Returns:
+        pd.DataFrame: Long dataframe with "Year", "Country" and "Value" columns.
+    """
+    # years are sorted, so the range is found with two binary searches and taken as a slice instead of a mask
+    years = df['Year'].to_numpy()
+    start = years.searchsorted(start_year, side='left')
+    end = years.searchsorted(end_year, side='right')
+    filtered_df = df.iloc[start:end]
+    if not compact:
+        filtered_df = filtered_df.assign(Year=filtered_df['Year'].astype(str))  # removes commas from the years
+    return filtered_df.melt(id_vars=['Year'], var_name='Country', value_name='Value')
+
+
+def is_heavy(df, start_year, end_year):
+    """Check if a chart of the year range would have more points than WEBGL_POINT_THRESHOLD.
+
+    Args:
+        df (pd.DataFrame): Dataframe containing the data.
+        start_year (int): First year of the range (inclusive).
+        end_year (int): Last year of the range (inclusive).
+
+    Returns:
+        bool: True if the chart should be drawn in the lightweight mode.
+    """
+    country_count = df.shape[1] - 1  # every column but Year is a country
+    return (end_year - start_year + 1) * country_count > WEBGL_POINT_THRESHOLD
+
+
+def format_percentage_axis(chart):
+    """Show the numeric values of a chart as percentages on the y axis and in hover labels.
+
+    Args:
+        chart (plotly.graph_objects.Figure): Chart with the values on the y axis.
+    """
+    chart.update_yaxes(ticksuffix="%")
+    chart.update_traces(hovertemplate=PERCENTAGE_HOVER)
+
+
+@timed("build_chart")
+def build_chart(kind, long_df, is_percentage, compact=False):
+    """Build a Plotly figure from a long dataframe.
+
+    Small charts look exactly as before. In the compact mode, meant for large multi-country
+    charts, lines are drawn with WebGL (Scattergl) and optionally downsampled, markers are
+    dropped and the years stay numeric, which keeps the payload small and the browser fast.
+    Area charts aren't downsampled, since stacking needs every series on the same years.
+
+    Args:
+        kind (str): "line", "area" or "bar".
+        long_df (pd.DataFrame): Dataframe returned by melt_years.
+        is_percentage (bool): Whether to display values as percentages.
+        compact (bool): Whether to use the lightweight mode (long_df must have numeric years).
+
+    Returns:
+        plotly.graph_objects.Figure: The chart.
+    """
+    import plotly.express as px
+    from downsample import decimate_long
+
+    labels = {'Value': 'Value (%)'} if is_percentage else None
+    if kind == 'line':
+        if compact and MAX_POINTS_PER_SERIES:
+            long_df = decimate_long(long_df, MAX_POINTS_PER_SERIES)
+        chart = px.line(long_df, x='Year', y='Value', color='Country', markers=not compact, labels=labels,
+                        render_mode='webgl' if compact else 'auto')
+    elif kind == 'area':
+        chart = px.area(long_df, x='Year', y='Value', color='Country', markers=not compact, labels=labels)
+        chart.update_layout(hovermode="x unified")
+    else:
+        chart = px.bar(long_df, x='Year', y='Value', color='Country', labels=labels)
+    if compact:
+        chart.update_xaxes(tickformat="d")  # numeric years are shown without commas
+    if is_percentage:
+        format_percentage_axis(chart)
+    if instrumentation.ENABLED:
+        # serializing again only to measure the payload is costly, so it only happens with metrics on
+        instrumentation.observe("chart_payload_bytes", len(chart.to_json()), kind=kind)
+    return chart
+
+
+def get_chart_cache(data_key):
+    """Get this session's chart cache, emptying it when the data has changed.
+
+    Args:
+        data_key: Key identifying the data the charts are built from.
+
+    Returns:
+        dict: Cache with "long" (melted dataframes by year range, least recently used first)
+            and "figures" (the last figure of every chart kind, with its key).
+    """
+    cache = st.session_state.get('chart_cache')
+    if cache is None or cache['data_key'] != data_key:
+        # figures of older data will never be shown again, so they are dropped instead of piling up
+        cache = {'data_key': data_key, 'long': OrderedDict(), 'figures': {}}
+        st.session_state.chart_cache = cache
+    return cache
+
+
+def get_chart(kind, df, start_year, end_year, is_percentage, data_key=None):
+    """Get a chart, reusing the melted data and the figure built for the same inputs.
+
+    The melted dataframe is shared by every chart showing the same year range, and a figure
+    is only rebuilt when its own inputs change (e.g. its slider moved).
+
+    Args:
+        kind (str): "line", "area" or "bar".
+        df (pd.DataFrame): Dataframe containing the data.
+        start_year (int): First year of the range (inclusive).
+        end_year (int): Last year of the range (inclusive).
+        is_percentage (bool): Whether to display values as percentages.
+        data_key: Key identifying df, charts aren't cached when it is None.
+
+    Returns:
+        plotly.graph_objects.Figure: The chart.
+    """
+    compact = is_heavy(df, start_year, end_year)
+    if data_key is None:
+        return build_chart(kind, melt_years(df, start_year, end_year, compact), is_percentage, compact)
+
+    cache = get_chart_cache(data_key)
+    figure_key = (start_year, end_year, is_percentage)
+    cached_key, figure = cache['figures'].get(kind, (None, None))
+    instrumentation.increment("cache_lookups_total", cache="chart", result="hit" if cached_key == figure_key else "miss")
+    if cached_key != figure_key:
+        # only the last figure of each chart is kept, so moving a slider around doesn't pile up figures
+        long_key = (start_year, end_year)
+        if long_key not in cache['long']:
+            cache['long'][long_key] = melt_years(df, start_year, end_year, compact)
+            if len(cache['long']) > MAX_CACHED_RANGES:
+                cache['long'].popitem(last=False)
+        cache['long'].move_to_end(long_key)
+        figure = build_chart(kind, cache['long'][long_key], is_percentage, compact)
+        cache['figures'][kind] = (figure_key, figure)
+    return figure
+
 
+def display_chart(kind, label, checkbox_key, slider_key, df, min_value, max_value, is_percentage, data_key):
+    """Display a chart checkbox and, if ticked, a year slider and the chart.
 
-def display_line_chart(df, min_value, max_value, is_percentage):
+    Args:
+        kind (str): "line", "area" or "bar".
+        label (str): Label of the checkbox.
+        checkbox_key (str): Unique key for the checkbox widget.
+        slider_key: Unique key for the slider widget.
+        df (pd.DataFrame): Dataframe containing the data.
+        min_value (int): Minimum year value.
+        max_value (int): Maximum year value.
+        is_percentage (bool): Whether to display values as percentages.
+        data_key: Key identifying df, charts aren't cached when it is None.
+    """
+    show_chart = st.checkbox(label, value=False, key=checkbox_key)
+    if show_chart:
+        start_year, end_year = year_slider(min_value, max_value, key=slider_key)
+        chart = get_chart(kind, df, start_year, end_year, is_percentage, data_key)
+        with timed("plotly_chart"):
+            st.plotly_chart(chart)
+
+
+def display_line_chart(df, min_value, max_value, is_percentage, data_key=None):
     """Display line chart with year slider.
 
     Args:
@@ -30,21 +214,12 @@ def display_line_chart(df, min_value, max_value, is_percentage):
         min_value (int): Minimum year value.
         max_value (int): Maximum year value.
         is_percentage (bool): Whether to display values as percentages.
+        data_key: Key identifying df, used to cache the chart between reruns.
     """
-    line_chart = st.checkbox("Display Line Chart", value=False, key='line')
-    if line_chart:
-        filtered_df = set_slider(df, min_value, max_value, key=1)
-        filtered_df['Year'] = df['Year'].astype(str)  # removes commas from the years
-        if is_percentage:
-            filtered_df = filtered_df.melt(id_vars=['Year'], var_name='Country', value_name='Value (%)')
-            chart = px.line(filtered_df, x='Year', y='Value (%)', color='Country', markers=True)
-        else:
-            filtered_df = filtered_df.melt(id_vars=['Year'], var_name='Country', value_name='Value')
-            chart = px.line(filtered_df, x='Year', y='Value', color='Country', markers=True)
-        st.plotly_chart(chart)
+    display_chart('line', "Display Line Chart", 'line', 1, df, min_value, max_value, is_percentage, data_key)
 
 
-def display_area_chart(df, min_value, max_value, is_percentage):
+def display_area_chart(df, min_value, max_value, is_percentage, data_key=None):
     """Display area chart with year slider.
 
     Args:
@@ -52,23 +227,12 @@ def display_area_chart(df, min_value, max_value, is_percentage):
         min_value (int): Minimum year value.
         max_value (int): Maximum year value.
         is_percentage (bool): Whether to display values as percentages.
+        data_key: Key identifying df, used to cache the chart between reruns.
     """
-    area_chart = st.checkbox("Display Area Chart", value=False, key='area')
-    if area_chart:
-        filtered_df = set_slider(df, min_value, max_value, key=3)
-        filtered_df['Year'] = df['Year'].astype(str)  # removes commas from the years
-        if is_percentage:
-            filtered_df = filtered_df.melt(id_vars=['Year'], var_name='Country', value_name='Value (%)')
-            chart = px.area(filtered_df, x='Year', y='Value (%)', color='Country', markers=True)
-            chart.update_layout(hovermode="x unified")
-        else:
-            filtered_df = filtered_df.melt(id_vars=['Year'], var_name='Country', value_name='Value')
-            chart = px.area(filtered_df, x='Year', y='Value', color='Country', markers=True)
-            chart.update_layout(hovermode="x unified")
-        st.plotly_chart(chart)
+    display_chart('area', "Display Area Chart", 'area', 3, df, min_value, max_value, is_percentage, data_key)
 
 
-def display_bar_chart(df, min_value, max_value, is_percentage):
+def display_bar_chart(df, min_value, max_value, is_percentage, data_key=None):
     """Display bar chart with year slider.
 
     Args:
@@ -76,28 +240,103 @@ def display_bar_chart(df, min_value, max_value, is_percentage):
         min_value (int): Minimum year value.
         max_value (int): Maximum year value.
         is_percentage (bool): Whether to display values as percentages.
+        data_key: Key identifying df, used to cache the chart between reruns.
     """
-    bar_chart = st.checkbox("Display Bar Chart", value=False, key='bar')
-    if bar_chart:
-        filtered_df = set_slider(df, min_value, max_value, key=2)
-        filtered_df['Year'] = df['Year'].astype(str)  # removes commas from the years
-        if is_percentage:
-            filtered_df = filtered_df.melt(id_vars=['Year'], var_name='Country', value_name='Value (%)')
-            chart = px.bar(filtered_df, x='Year', y='Value (%)', color='Country')
-        else:
-            filtered_df = filtered_df.melt(id_vars=['Year'], var_name='Country', value_name='Value')
-            chart = px.bar(filtered_df, x='Year', y='Value', color='Country')
-        st.plotly_chart(chart)
+    display_chart('bar', "Display Bar Chart", 'bar', 2, df, min_value, max_value, is_percentage, data_key)
 
 
-def display_table(df):
+def display_table(df, is_percentage=False):
     """Display data table.
 
     Args:
         df (pd.DataFrame): Dataframe containing the data.
+        is_percentage (bool): Whether to display values as percentages.
     """
     table = st.checkbox("Display Table", value=False, key='table')
     if table:
-        df['Year'] = df['Year'].astype(str)  # removes commas from the years
-        df = df.sort_values(by='Year', ascending=False)
-        st.dataframe(df, hide_index=True)
+        df = df.sort_values(by='Year', ascending=False)  # sorting returns a copy, so the caller's dataframe is untouched
+        column_config = {'Year': st.column_config.NumberColumn(format="%d")}  # removes commas from the years
+        if is_percentage:
+            # numbers stay numeric, only their display is formatted (2 decimal places, "No Data" instead of "nan%")
+            countries = [column for column in df.columns if column != 'Year']
+            df = df.style.format("{:.2f}%", na_rep="No Data", subset=countries)
+        st.dataframe(df, hide_index=True, column_config=column_config)
+
+
+def get_map_layer(key, build):
+    """Get this session's map layer, rebuilding it only when its key changes.
+
+    Args:
+        key (tuple): Map mode, options and selection the layer was built for.
+        build (callable): Builds the layer, called with no arguments.
+
+    Returns:
+        The cached points dataframe or figure.
+    """
+    cache = st.session_state.get('map_cache')
+    if cache is None or cache['key'] != key:
+        cache = {'key': key, 'layer': build()}
+        st.session_state.map_cache = cache
+    return cache['layer']
+
+
+@st.cache_resource
+def build_choropleth(color_by):
+    """Build the all-countries choropleth once per process.
+
+    Args:
+        color_by (str): Key of geodata.COLOR_BY.
+
+    Returns:
+        plotly.graph_objects.Figure: Every country colored by its region or income level.
+    """
+    import plotly.express as px
+    from geodata import COLOR_BY, get_geodata
+
+    chart = px.choropleth(get_geodata().frame(), locations='id', color=COLOR_BY[color_by], hover_name='Country',
+                          hover_data={'id': False})
+    chart.update_geos(showframe=False, projection_type="natural earth")
+    chart.update_layout(margin=dict(l=0, r=0, t=0, b=0), legend=dict(orientation="h"))
+    return chart
+
+
+def build_selection_choropleth(color_by, selected_countries):
+    """Draw the selected countries as points on top of the shared choropleth.
+
+    Args:
+        color_by (str): Key of geodata.COLOR_BY.
+        selected_countries (list): Country names.
+
+    Returns:
+        plotly.graph_objects.Figure: Copy of the choropleth with the selection added.
+    """
+    import plotly.graph_objects as go
+    from geodata import get_geodata
+
+    points = get_geodata().points(selected_countries)
+    chart = go.Figure(build_choropleth(color_by))  # copied, the shared figure is never modified
+    chart.add_trace(go.Scattergeo(lat=points['latitude'], lon=points['longitude'], mode='markers',
+                                  marker=dict(color='red', size=8), name="Selected", hoverinfo='skip'))
+    return chart
+
+
+def display_map(selected_countries):
+    """Display the selected countries on a map, or every country as a choropleth.
+
+    Layers are kept in the session while the selection and options don't change, so a rerun
+    caused by another widget reuses them.
+
+    Args:
+        selected_countries (list): Country names.
+    """
+    from geodata import COLOR_BY, get_geodata
+
+    mode = st.radio("Map", ["Selected countries", "All countries"], horizontal=True, key='map_mode')
+    if mode == "Selected countries":
+        points = get_map_layer(('points', tuple(selected_countries)), lambda: get_geodata().points(selected_countries))
+        st.map(points)  # displays each selected country as a red dot
+    else:
+        color_by = st.radio("Color by", list(COLOR_BY), format_func=COLOR_BY.get, horizontal=True, key='map_color')
+        chart = get_map_layer(('choropleth', color_by, tuple(selected_countries)),
+                              lambda: build_selection_choropleth(color_by, selected_countries))
+        st.plotly_chart(chart)
@@ -0,0 +1,107 @@
+"""Module for the bundled snapshot of the country list.
+
+The country list changes very rarely, so the dashboard reads it from a small JSON file
+shipped with the app instead of waiting on the World Bank API (and importing the HTTP and
+data stack) before its first paint. The snapshot is written when deploying, by
+
+    python country_snapshot.py
+
+or by bulk_ingest.py. Without a snapshot, the country list is fetched as before.
+
+Every caller gets the country list in the same order of precedence (load_countries): the
+preloaded store's, else the snapshot, else the World Bank API.
+"""
+import argparse
+import functools
+import json
+import os
+
+import indicator_store
+
+SNAPSHOT_PATH = os.environ.get(
+    "COUNTRYDATA_COUNTRIES_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "countries_snapshot.json")
+)
+
+
+def load_snapshot(path=None):
+    """Read the bundled country list.
+
+    Args:
+        path (str): Snapshot file, defaults to SNAPSHOT_PATH.
+
+    Returns:
+        dict: Countries in the same shape fetch_countries returns, or None if there is no
+            snapshot.
+    """
+    path = path or SNAPSHOT_PATH
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)["countries"]
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot(countries, path=None):
+    """Write the country list to the snapshot file, replacing it atomically.
+
+    Args:
+        countries (dict): Countries as returned by download_countries.
+        path (str): Snapshot file, defaults to SNAPSHOT_PATH.
+
+    Returns:
+        str: Path of the written file.
+    """
+    path = path or SNAPSHOT_PATH
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"countries": countries}, file, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load_countries():
+    """Get the country list: the preloaded store's, else the snapshot's, else the API's.
+
+    The store's list is read from its metadata file only, once per store version, since
+    the store's cube is laid out in that order. The fetching modules are only imported
+    when there is neither a store nor a snapshot, so a cold start doesn't load them before
+    the first paint.
+
+    Returns:
+        dict: Dictionary mapping country names to their id, latitude, longitude, region
+            and income level (shared, must not be modified).
+    """
+    countries = indicator_store.read_countries()
+    if countries is not None:
+        return countries
+    return load_listed_countries()
+
+
+@functools.lru_cache(maxsize=None)
+def load_listed_countries():
+    """Get the country list from the snapshot, else from the API, once per process.
+
+    Returns:
+        dict: Same as load_countries.
+    """
+    snapshot = load_snapshot()
+    if snapshot is not None:
+        return snapshot
+    from data_fetcher import download_countries
+    return download_countries()
+
+
+def main():
+    """Parse the command line and refresh the snapshot from the World Bank API."""
+    parser = argparse.ArgumentParser(description="Refresh the bundled country list from the World Bank API.")
+    parser.add_argument("--output", default=None, help=f"snapshot file (default: {SNAPSHOT_PATH})")
+    args = parser.parse_args()
+    from data_fetcher import download_countries
+
+    countries = download_countries()
+    path = write_snapshot(countries, args.output)
+    print(f"Wrote {len(countries)} countries to {path}")
+
+
+if __name__ == "__main__":
+    main()
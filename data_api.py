@@ -0,0 +1,141 @@
+"""Module for the headless Python API over the dashboard's data.
+
+Other tools can import these functions to read countries, raw indicator series and the
+dashboard's Year x Country tables without running Streamlit. They go through the same
+preloaded store, on-disk cache and API client as the dashboard, and every result is a
+pandas dataframe, so it can be written as JSON, CSV, Arrow or Parquet (see data_service.py).
+"""
+import numpy as np
+import pandas as pd
+
+from data_fetcher import fetch_countries, fetch_indicator_data, get_cube
+from data_processor import process_indicator_data
+from indicator_config import get_all_indicators, is_percentage_indicator
+
+
+class NotFoundError(LookupError):
+    """Raised when a requested indicator or country isn't known."""
+
+
+class BadRequestError(ValueError):
+    """Raised when a request is missing a required argument."""
+
+
+def list_countries():
+    """List every country with its metadata.
+
+    Returns:
+        pd.DataFrame: "id", "name", "latitude", "longitude", "region" and "income_level" columns.
+    """
+    countries = fetch_countries()
+    return pd.DataFrame({
+        "id": [country['id'] for country in countries.values()],
+        "name": list(countries),
+        "latitude": pd.to_numeric([country.get('latitude') for country in countries.values()], errors="coerce"),
+        "longitude": pd.to_numeric([country.get('longitude') for country in countries.values()], errors="coerce"),
+        "region": [country.get('region') for country in countries.values()],
+        "income_level": [country.get('income_level') for country in countries.values()]
+    })
+
+
+def list_indicators():
+    """List the indicators configured in the dashboard.
+
+    Returns:
+        pd.DataFrame: "id", "name" and "percentage" columns.
+    """
+    indicators = get_all_indicators()
+    return pd.DataFrame({
+        "id": list(indicators),
+        "name": list(indicators.values()),
+        "percentage": [is_percentage_indicator(code) for code in indicators]
+    })
+
+
+def check_indicator(indicator):
+    """Check that an indicator is one of the configured ones.
+
+    Only configured indicators are served, so requests for arbitrary codes can't fill the
+    on-disk cache with series nobody looks at.
+
+    Args:
+        indicator (str): World Bank indicator code.
+
+    Raises:
+        BadRequestError: If the code is missing.
+        NotFoundError: If the code isn't a configured indicator.
+    """
+    if not indicator:
+        raise BadRequestError("missing indicator code")
+    if indicator not in get_all_indicators():
+        raise NotFoundError(f"unknown indicator {indicator!r}, see list_indicators() for the configured ones")
+
+
+def resolve_countries(country_ids=None):
+    """Map ISO3 country codes to the country names the pipeline is keyed by.
+
+    Args:
+        country_ids (list): ISO3 country codes, or None for every country.
+
+    Returns:
+        tuple: (names, ids) in the requested order.
+
+    Raises:
+        NotFoundError: If a code isn't a known country.
+    """
+    countries = fetch_countries()
+    if country_ids is None:
+        return list(countries), [country['id'] for country in countries.values()]
+    country_ids = list(dict.fromkeys(country_ids))  # drops repeated codes, keeps the order
+    names_by_id = {country['id']: name for name, country in countries.items()}
+    unknown = [country_id for country_id in country_ids if country_id not in names_by_id]
+    if unknown:
+        raise NotFoundError(f"unknown country codes: {', '.join(unknown)}")
+    return [names_by_id[country_id] for country_id in country_ids], country_ids
+
+
+def get_series(indicator, country_ids=None):
+    """Get the raw series of an indicator in long format.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        country_ids (list): ISO3 country codes, or None for every country.
+
+    Returns:
+        pd.DataFrame: "country_id", "year" and "value" columns (NaN for missing values),
+            one row per reported year, countries in the requested order.
+    """
+    check_indicator(indicator)
+    names, ids = resolve_countries(country_ids)
+    indicator_data = fetch_indicator_data(names, fetch_countries(), indicator, require_all=True)
+    series = [indicator_data[name] for name in names]
+    lengths = [len(data['dates']) for data in series]
+    return pd.DataFrame({
+        "country_id": np.repeat(np.array(ids, dtype=object), lengths),
+        "year": np.concatenate([np.asarray(data['dates'], dtype=np.int16) for data in series] or [np.empty(0, np.int16)]),
+        "value": np.concatenate([np.asarray(data['values'], dtype=np.float64) for data in series] or [np.empty(0)])
+    })
+
+
+def get_table(indicator, country_ids=None):
+    """Get the dashboard's Year x Country table of an indicator.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        country_ids (list): ISO3 country codes, or None for every country.
+
+    Returns:
+        pd.DataFrame: "Year" column plus one column per country (named by ISO3 code), from
+            the first to the last year with data; only "Year" if no country has data.
+    """
+    check_indicator(indicator)
+    names, ids = resolve_countries(country_ids)
+    cube = get_cube()
+    if cube is not None and cube.has(indicator, names):
+        df, _, _, _ = cube.frame(indicator, names)
+    else:
+        indicator_data = fetch_indicator_data(names, fetch_countries(), indicator, require_all=True)
+        df, _, _, _ = process_indicator_data(indicator_data)
+    if df is None:
+        return pd.DataFrame({"Year": np.empty(0, dtype=np.int64)})
+    return df.set_axis(["Year", *ids], axis=1)
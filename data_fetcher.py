@@ -1,21 +1,218 @@
-"""Module for fetching country and indicator data from World Bank API."""
+"""Module for fetching country and indicator data from World Bank API.
+
+Nothing here depends on Streamlit: results are cached per process (and on disk), so the
+same functions serve the dashboard, the command line tools and the headless data service.
+"""
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import country_snapshot
+import indicator_cache
+import indicator_store
+import instrumentation
+from indicator_cube import IndicatorCube
+from instrumentation import timed
+from response_parser import empty_series, merge_pages, parse_indicator_response, split_series
+from singleflight import SingleFlight
+from throttle import TokenBucket
+
+API_BASE_URL = os.environ.get("WORLD_BANK_API_URL", "https://api.worldbank.org/v2")
+MAX_WORKERS = int(os.environ.get("WORLD_BANK_MAX_WORKERS", "8"))  # upper bound on parallel requests per fetch
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds for each request
+BATCH_SIZE = 40  # countries per multi-country request
+PER_PAGE = 1000  # rows per page, series longer than this are fetched page by page
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5  # sleeps 0.5s, 1s, 2s between retries
+API_MAX_CONCURRENCY = int(os.environ.get("WORLD_BANK_MAX_CONCURRENCY", "16"))  # requests in flight per process
+API_RATE = float(os.environ.get("WORLD_BANK_RATE", "20"))  # requests per second per process
+API_BURST = float(os.environ.get("WORLD_BANK_BURST", "40"))
+
+_session = None
+_session_lock = threading.Lock()
+_store = None  # (version, store) of the last loaded store
+_store_lock = threading.Lock()
+_api_slots = threading.BoundedSemaphore(API_MAX_CONCURRENCY)
+_api_budget = TokenBucket(API_RATE, API_BURST)
+_flights = SingleFlight()  # shares in-flight fetches between sessions
+
+
+class MissingDataError(requests.RequestException):
+    """Raised when some countries couldn't be fetched and nothing is cached for them."""
+
+    def __init__(self, indicator, country_ids):
+        """Create an error.
+
+        Args:
+            indicator (str): World Bank indicator code.
+            country_ids (list): ISO3 codes of the countries that couldn't be fetched.
+        """
+        super().__init__(f"couldn't fetch {indicator} for {', '.join(country_ids)}")
+        self.indicator = indicator
+        self.country_ids = list(country_ids)
+
+
+def get_session():
+    """Get the shared HTTP session used for all World Bank API calls.
+
+    The session keeps connections alive between reruns and retries failed requests with
+    exponential backoff, so each fetch doesn't pay for a new TCP/TLS handshake.
+
+    Returns:
+        requests.Session: Process-wide session with a pooled connection adapter.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=RETRY_TOTAL,
+                    backoff_factor=RETRY_BACKOFF,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["GET"]
+                )
+                # one kept-alive connection per request the process lets in flight, so none is discarded
+                pool_size = max(MAX_WORKERS, API_MAX_CONCURRENCY)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_response(url, headers=None):
+    """Send a GET request through the shared session.
+
+    Every request in the process goes through one concurrency limit and one token bucket,
+    so a spike of sessions can't flood the API.
 
+    Args:
+        url (str): Full request URL.
+        headers (dict): Extra request headers (e.g. If-None-Match for revalidation).
+
+    Returns:
+        requests.Response: Response with a non-error status (a 304 is returned as is).
+    """
+    _api_budget.acquire()
+    with _api_slots:
+        response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if instrumentation.ENABLED:
+        instrumentation.increment("http_requests_total", status=response.status_code)
+        instrumentation.increment("http_response_bytes_total", len(response.content))
+    response.raise_for_status()
+    return response
+
+
+def get_json(url):
+    """Send a GET request through the shared session and decode the JSON body.
+
+    Args:
+        url (str): Full request URL.
+
+    Returns:
+        list: Decoded World Bank response ([metadata, rows]).
+    """
+    return get_response(url).json()
+
+
+def get_store():
+    """Get the preloaded indicator store, reloading it when bulk_ingest.py switched to a new version.
+
+    Only the store's small pointer file is read on every call; the store itself is loaded
+    once per version and shared by every caller.
+
+    Returns:
+        indicator_store.IndicatorStore: The store written by bulk_ingest.py, or None if there is none.
+    """
+    global _store
+    version = indicator_store.current_version()
+    if _store is None or _store[0] != version:
+        with _store_lock:
+            if _store is None or _store[0] != version:
+                _store = (version, indicator_store.load_store())
+    return _store[1]
 
-@st.cache_data
+
+def get_store_version():
+    """Get the version of the preloaded store, for keying caches built from it.
+
+    Returns:
+        str: Version of the store, or None if there is none.
+    """
+    store = get_store()
+    return store.version if store is not None else None
+
+
+@functools.lru_cache(maxsize=1)
+def build_store_cube(store):
+    """Build the in-memory cube of a store, once per store version.
+
+    Args:
+        store (indicator_store.IndicatorStore): Loaded store.
+
+    Returns:
+        indicator_cube.IndicatorCube: Cube of every indicator in the store.
+    """
+    return IndicatorCube.from_store(store)
+
+
+def get_cube():
+    """Get the shared in-memory indicator cube of the current store.
+
+    Returns:
+        indicator_cube.IndicatorCube: Cube of every indicator in the store, or None if there is no store.
+    """
+    store = get_store()
+    if store is None:
+        return None
+    return build_store_cube(store)
+
+
+@timed("fetch_countries")
 def fetch_countries():
-    """Fetch country data from World Bank API.
+    """Fetch country data from the preloaded store, else the bundled snapshot, else the World Bank API.
+
+    The result is shared by every caller, so it must not be modified. See
+    country_snapshot.load_countries, which the dashboard's first paint uses directly.
 
     Returns:
-        dict: Dictionary mapping country names to their id, latitude, and longitude.
+        dict: Dictionary mapping country names to their id, latitude, longitude, region
+            and income level.
     """
-    url = "https://api.worldbank.org/v2/country?format=json&per_page=300"
-    response = requests.get(url)
-    data = response.json()
+    return country_snapshot.load_countries()
+
+
+def download_countries():
+    """Download country data from World Bank API.
+
+    Concurrent cold starts share one download.
+
+    Returns:
+        dict: Dictionary mapping country names to their id, latitude, longitude, region
+            and income level.
+    """
+    return _flights.do(("countries",), request_countries)
+
+
+def request_countries():
+    """Request the country list from World Bank API.
+
+    Returns:
+        dict: Dictionary mapping country names to their id, latitude, longitude, region
+            and income level.
+    """
+    url = f"{API_BASE_URL}/country?format=json&per_page=300"
+    data = get_json(url)
     countries_dict = {}  # create a country dictionary
     for item in data[1]:
-        # gets name, id, latitude, and longitude of each country
+        # gets name, id, latitude, longitude, region and income level of each country
         if item['id'] not in ['CHI', 'SXM', 'PSE', 'MAF', 'GIB', 'CUW', 'NA'] and item['region']['id'] != 'NA':
             # exclude countries/territories with no longitude/latitude and remove non-countries (regions)
             # 'NA' excludes aggregates. Although the json file has
@@ -25,36 +222,280 @@ def fetch_countries():
             countries_dict[item['name']] = {
                 "id": item['id'],
                 "latitude": item.get('latitude'),
-                "longitude": item.get('longitude')
+                "longitude": item.get('longitude'),
+                "region": item['region']['value'],  # used to group countries in the aggregate views
+                "income_level": (item.get('incomeLevel') or {}).get('value')
             }
     return countries_dict
 
 
-def fetch_indicator_data(selected_countries, countries_dict, indicator):
+def plan_batches(country_ids, batch_size=None):
+    """Group country ids into multi-country request paths.
+
+    The World Bank API accepts several countries in one call when their ids are joined
+    with semicolons (e.g. "AFG;BRA;CHN").
+
+    Args:
+        country_ids (list): ISO3 country codes.
+        batch_size (int): Maximum number of countries per request, defaults to BATCH_SIZE.
+
+    Returns:
+        list: Semicolon-joined country id strings, one per request.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    return [";".join(country_ids[i:i + batch_size]) for i in range(0, len(country_ids), batch_size)]
+
+
+def indicator_url(country_path, indicator, page=1):
+    """Build the URL of one page of an indicator request.
+
+    Args:
+        country_path (str): One country id or several joined with semicolons.
+        indicator (str): World Bank indicator code.
+        page (int): Page number (starting at 1).
+
+    Returns:
+        str: Request URL.
+    """
+    return f"{API_BASE_URL}/country/{country_path}/indicator/{indicator}?format=json&per_page={PER_PAGE}&page={page}"
+
+
+def fetch_page(country_path, indicator, page):
+    """Fetch and parse one page of an indicator request.
+
+    Args:
+        country_path (str): One country id or several joined with semicolons.
+        indicator (str): World Bank indicator code.
+        page (int): Page number (starting at 1).
+
+    Returns:
+        tuple: (metadata, runs, years, values) as returned by parse_indicator_response.
+    """
+    return parse_indicator_response(get_response(indicator_url(country_path, indicator, page)).content)
+
+
+def fetch_batch_series(country_path, indicator, executor):
+    """Fetch every row of an indicator request, following all pages.
+
+    The first page is read for its metadata (data[0]["pages"]); the remaining pages are
+    then fetched concurrently so long series are never truncated.
+
+    Args:
+        country_path (str): One country id or several joined with semicolons.
+        indicator (str): World Bank indicator code.
+        executor (ThreadPoolExecutor): Pool used to fetch the remaining pages.
+
+    Returns:
+        tuple: (series, validators) where series maps ISO3 country codes to their "dates"
+            and "values" arrays and validators holds the "source_url", "etag" and
+            "last_modified" used to revalidate the request later (etag and last_modified
+            are None for multi-page responses).
+    """
+    url = indicator_url(country_path, indicator)
+    response = get_response(url)
+    first_page = parse_indicator_response(response.content)
+    pages = int(first_page[0].get('pages') or 1)
+    validators = {"source_url": url, "etag": None, "last_modified": None}
+    if pages > 1:
+        futures = [executor.submit(fetch_page, country_path, indicator, page) for page in range(2, pages + 1)]
+        runs, years, values = merge_pages([first_page] + [future.result() for future in futures])
+    else:
+        _, runs, years, values = first_page
+        # the validators of page one only describe the whole response when there is a single page
+        validators["etag"] = response.headers.get("ETag")
+        validators["last_modified"] = response.headers.get("Last-Modified")
+    return split_series(runs, years, values), validators
+
+
+@timed("download_series")
+def download_series(country_ids, indicator):
+    """Download series from the API in batched, paginated requests and store them in the cache.
+
+    Args:
+        country_ids (list): ISO3 country codes.
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        dict: Dictionary mapping every requested country id to its "dates" (int16) and
+            "values" (float64, NaN for missing data) arrays, empty for countries the API
+            returned no rows for.
+    """
+    series = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # batches run on their own pool so that waiting on a batch never blocks the page fetches
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as batch_executor:
+            futures = {
+                country_path: batch_executor.submit(fetch_batch_series, country_path, indicator, executor)
+                for country_path in plan_batches(country_ids)
+            }
+            for country_path, future in futures.items():
+                batch_series, validators = future.result()
+                batch_series = {
+                    country_id: batch_series.get(country_id) or empty_series()
+                    for country_id in country_path.split(";")
+                }
+                # countries without rows are cached too, so they aren't requested again on every rerun
+                indicator_cache.put_entries(indicator, batch_series, **validators)
+                series.update(batch_series)
+    return series
+
+
+@timed("revalidate_series")
+def revalidate_series(indicator, stale_entries):
+    """Revalidate expired cache entries with conditional requests.
+
+    Entries that came from the same response share one conditional request. A 304 marks
+    them fresh again without downloading anything.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        stale_entries (dict): Dictionary mapping country ids to expired cache entries.
+
+    Returns:
+        tuple: (series, refetch_ids) where series maps revalidated country ids to their
+            "dates" and "values", and refetch_ids lists the ids that need a full download.
+    """
+    groups = {}
+    refetch_ids = []
+    for country_id, entry in stale_entries.items():
+        if entry["source_url"] and (entry["etag"] or entry["last_modified"]):
+            groups.setdefault(entry["source_url"], []).append(country_id)
+        else:
+            refetch_ids.append(country_id)
+
+    def revalidate(source_url, country_ids):
+        entry = stale_entries[country_ids[0]]
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return get_response(source_url, headers=headers)
+
+    series = {}
+    if groups:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {source_url: executor.submit(revalidate, source_url, ids) for source_url, ids in groups.items()}
+            for source_url, future in futures.items():
+                country_ids = groups[source_url]
+                response = future.result()
+                if response.status_code == 304:
+                    indicator_cache.touch_entries(indicator, country_ids)
+                    series.update({country_id: stale_entries[country_id] for country_id in country_ids})
+                    continue
+                metadata, runs, years, values = parse_indicator_response(response.content)
+                if int(metadata.get('pages') or 1) > 1:
+                    refetch_ids.extend(country_ids)  # the series grew past one page
+                    continue
+                response_series = split_series(runs, years, values)
+                response_series = {
+                    country_id: response_series.get(country_id) or empty_series()
+                    for country_id in country_ids
+                }
+                indicator_cache.put_entries(
+                    indicator, response_series, source_url=source_url,
+                    etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified")
+                )
+                series.update(response_series)
+    return series, refetch_ids
+
+
+def fetch_series_by_id(country_ids, indicator):
+    """Fetch series by country id through the on-disk cache.
+
+    Fresh series are served from the cache. Expired ones are revalidated and missing ones
+    are downloaded in batched, paginated requests; series another session is already
+    fetching are waited for instead of being requested twice. If the API can't be reached
+    (or offline mode is on) the cached data is served even when stale.
+
+    Args:
+        country_ids (list): ISO3 country codes.
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        dict: Dictionary mapping country ids to cache entries or series with "dates" and
+            "values" arrays. A country the API has no data for maps to empty arrays; a
+            country that couldn't be fetched and has nothing cached is left out.
+    """
+    entries = indicator_cache.get_entries(indicator, country_ids)
+    now = time.time()
+    series = {country_id: entry for country_id, entry in entries.items() if indicator_cache.is_fresh(entry, now)}
+    stale_entries = {country_id: entry for country_id, entry in entries.items() if country_id not in series}
+    missing_ids = [country_id for country_id in country_ids if country_id not in entries]
+    instrumentation.increment("cache_lookups_total", len(series), cache="disk", result="hit")
+    instrumentation.increment("cache_lookups_total", len(stale_entries), cache="disk", result="stale")
+    instrumentation.increment("cache_lookups_total", len(missing_ids), cache="disk", result="miss")
+
+    if not indicator_cache.OFFLINE and (stale_entries or missing_ids):
+        def refresh(keys):
+            # called with the (indicator, country id) pairs no other session is fetching right now
+            owned_ids = {country_id for _, country_id in keys}
+            refreshed = {}
+            owned_stale = {country_id: entry for country_id, entry in stale_entries.items() if country_id in owned_ids}
+            download_ids = [country_id for country_id in missing_ids if country_id in owned_ids]
+            if owned_stale:
+                revalidated, refetch_ids = revalidate_series(indicator, owned_stale)
+                refreshed.update(revalidated)
+                download_ids.extend(refetch_ids)
+            if download_ids:
+                refreshed.update(download_series(download_ids, indicator))
+            return {(indicator, country_id): country_series for country_id, country_series in refreshed.items()}
+
+        keys = [(indicator, country_id) for country_id in [*stale_entries, *missing_ids]]
+        try:
+            fetched = _flights.do_many(keys, refresh)
+            series.update({country_id: country_series for (_, country_id), country_series in fetched.items()})
+        except requests.RequestException:
+            if not entries:
+                raise  # nothing cached to fall back on
+            # the API is unreachable, so serve stale data instead of failing; the missing
+            # countries are left out of the result, so callers can report them
+            instrumentation.increment("fetch_failures_total", len(missing_ids))
+
+    for country_id, entry in stale_entries.items():
+        series.setdefault(country_id, entry)
+    return series
+
+
+@timed("fetch_indicator_data")
+def fetch_indicator_data(selected_countries, countries_dict, indicator, require_all=False):
     """Fetch indicator data for selected countries.
 
+    Indicators in the preloaded store are read from it directly, everything else goes
+    through the on-disk cache and the API (see fetch_series_by_id).
+
     Args:
         selected_countries (list): List of country names.
         countries_dict (dict): Dictionary of country data.
         indicator (str): World Bank indicator code.
+        require_all (bool): Raise instead of leaving out countries that couldn't be fetched.
 
     Returns:
-        dict: Dictionary mapping country names to their dates and values.
+        dict: Dictionary mapping country names to their dates and values. Countries without
+            data have empty arrays; countries that couldn't be fetched (API unreachable and
+            nothing cached) are left out.
+
+    Raises:
+        MissingDataError: If require_all is set and some countries couldn't be fetched.
     """
-    indicator_data = {}
-    for country in selected_countries:
-        country_id = countries_dict[country]['id']
-        url = f"https://api.worldbank.org/v2/country/{country_id}/indicator/{indicator}?format=json&per_page=100"
-        response = requests.get(url)
-        data = response.json()
-        dates = []
-        values = []
-        for item in data[1]:  # data[1] is where all country info is located
-            if 'value' in item:
-                # obtain the year and value corresponding to the specified indicator
-                dates.append(item["date"])
-                values.append(item["value"])
-
-        indicator_data[country] = {"dates": dates, "values": values}
+    if not selected_countries:
+        return {}
 
+    country_ids = [countries_dict[country]['id'] for country in selected_countries]
+    store = get_store()
+    if store is not None and store.has_indicator(indicator) and store.has_countries(country_ids):
+        instrumentation.increment("cache_lookups_total", len(country_ids), cache="store", result="hit")
+        return store.indicator_data(selected_countries, indicator)  # no network call needed
+
+    series = fetch_series_by_id(country_ids, indicator)
+
+    missing_ids = [country_id for country_id in country_ids if country_id not in series]
+    if missing_ids and require_all:
+        raise MissingDataError(indicator, missing_ids)
+
+    # results are collected in selection order so the table and chart columns keep the user's order
+    indicator_data = {}
+    for country, country_id in zip(selected_countries, country_ids, strict=True):
+        if country_id in series:
+            indicator_data[country] = {"dates": series[country_id]["dates"], "values": series[country_id]["values"]}
     return indicator_data
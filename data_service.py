@@ -0,0 +1,331 @@
+"""Headless HTTP service exposing countries, indicator series and Year x Country tables.
+
+Usage:
+    python data_service.py [--host HOST] [--port PORT]
+    gunicorn --workers 4 --threads 8 data_service:app
+
+The service is a plain WSGI application: the built-in server handles each request on its
+own thread, and any WSGI server (gunicorn, uWSGI, waitress) can run it with several worker
+processes. Endpoints (GET or HEAD):
+
+    /health
+    /countries
+    /indicators
+    /series?indicator=CODE[&countries=AFG;BRA]   raw series, one row per country and year
+    /table?indicator=CODE[&countries=AFG;BRA]    Year x Country table, as in the dashboard
+    /metrics                                     Prometheus metrics, when COUNTRYDATA_METRICS=1
+
+Responses are JSON by default; pass format=csv, arrow (Arrow IPC stream) or parquet, or
+the matching Accept header. Arrow and Parquet need pyarrow. Every response carries an
+ETag, and requests with a matching If-None-Match get an empty 304.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+
+import data_api
+import instrumentation
+from instrumentation import timed
+from singleflight import SingleFlight
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+MAX_AGE = int(os.environ.get("DATA_SERVICE_MAX_AGE", "300"))  # seconds clients and the response cache may reuse a response
+RESPONSE_CACHE_SIZE = int(os.environ.get("DATA_SERVICE_CACHE_SIZE", "256"))  # serialized responses kept in memory
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+STATUS_LINES = {
+    200: "200 OK", 304: "304 Not Modified", 400: "400 Bad Request", 404: "404 Not Found",
+    405: "405 Method Not Allowed", 406: "406 Not Acceptable", 502: "502 Bad Gateway"
+}
+
+_responses = OrderedDict()  # (path, query, format) -> (expires at, etag, body), least recently used first
+_responses_lock = threading.Lock()
+_flights = SingleFlight()  # concurrent requests for the same missing response build it once
+
+
+class HTTPError(Exception):
+    """Error answered with a JSON body and the given status."""
+
+    def __init__(self, status, message):
+        """Create an error.
+
+        Args:
+            status (int): HTTP status code.
+            message (str): Description sent to the client.
+        """
+        super().__init__(message)
+        self.status = status
+
+
+def parse_country_ids(query):
+    """Read the requested countries from the query string.
+
+    Args:
+        query (dict): Parsed query string.
+
+    Returns:
+        list: ISO3 codes (upper case), or None for every country.
+    """
+    value = query.get("countries", [""])[0]
+    if not value:
+        return None
+    return [country_id.strip().upper() for country_id in value.replace(",", ";").split(";") if country_id.strip()]
+
+
+def countries_endpoint(query):
+    """Answer /countries."""
+    return data_api.list_countries()
+
+
+def indicators_endpoint(query):
+    """Answer /indicators."""
+    return data_api.list_indicators()
+
+
+def series_endpoint(query):
+    """Answer /series."""
+    return data_api.get_series(query.get("indicator", [""])[0], parse_country_ids(query))
+
+
+def table_endpoint(query):
+    """Answer /table."""
+    return data_api.get_table(query.get("indicator", [""])[0], parse_country_ids(query))
+
+
+ENDPOINTS = {
+    "/countries": countries_endpoint,
+    "/indicators": indicators_endpoint,
+    "/series": series_endpoint,
+    "/table": table_endpoint
+}
+
+
+def choose_format(query, accept):
+    """Pick the response format from the format parameter, else from the Accept header.
+
+    Args:
+        query (dict): Parsed query string.
+        accept (str): Accept header of the request.
+
+    Returns:
+        str: Key of CONTENT_TYPES.
+
+    Raises:
+        HTTPError: If the format is unknown, or needs pyarrow and it isn't installed.
+    """
+    response_format = query.get("format", [""])[0].lower()
+    if not response_format:
+        accept = accept or ""
+        matches = [name for name, content_type in CONTENT_TYPES.items() if content_type.split(";")[0] in accept]
+        response_format = matches[0] if matches else "json"
+    if response_format not in CONTENT_TYPES:
+        raise HTTPError(406, f"unknown format {response_format!r}, use one of {', '.join(CONTENT_TYPES)}")
+    if response_format in ("arrow", "parquet") and pa is None:
+        raise HTTPError(406, f"the {response_format} format needs pyarrow, which isn't installed")
+    return response_format
+
+
+def serialize(df, response_format):
+    """Write a dataframe in a response format.
+
+    Args:
+        df (pd.DataFrame): Result of an endpoint.
+        response_format (str): Key of CONTENT_TYPES.
+
+    Returns:
+        bytes: Response body.
+    """
+    if response_format == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    if response_format == "json":
+        # json.dumps writes the shortest repr that round-trips every float, to_json rounds to fixed digits
+        records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+        return json.dumps(records, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if response_format == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def get_cached_response(key, build):
+    """Get a serialized response from the in-memory cache, building it when missing or expired.
+
+    Concurrent requests for the same missing response share one build.
+
+    Args:
+        key (tuple): (path, query string, format).
+        build (callable): Returns the response body, called with no arguments.
+
+    Returns:
+        tuple: (etag, body).
+    """
+    now = time.monotonic()
+    with _responses_lock:
+        cached = _responses.get(key)
+        if cached is not None and cached[0] > now:
+            _responses.move_to_end(key)
+            instrumentation.increment("cache_lookups_total", cache="service", result="hit")
+            return cached[1], cached[2]
+    instrumentation.increment("cache_lookups_total", cache="service", result="miss")
+
+    def build_entry():
+        body = build()
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        with _responses_lock:
+            _responses[key] = (time.monotonic() + MAX_AGE, etag, body)
+            _responses.move_to_end(key)
+            while len(_responses) > RESPONSE_CACHE_SIZE:
+                _responses.popitem(last=False)
+        return etag, body
+
+    return _flights.do(key, build_entry)
+
+
+def etag_matches(etag, if_none_match):
+    """Check an If-None-Match header against a response's ETag.
+
+    Args:
+        etag (str): Quoted ETag of the response.
+        if_none_match (str): Header value, may list several (weak) tags or be "*".
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def error_response(start_response, status, message):
+    """Answer with a JSON error body.
+
+    Args:
+        start_response (callable): WSGI start_response.
+        status (int): HTTP status code.
+        message (str): Description sent to the client.
+
+    Returns:
+        list: WSGI body.
+    """
+    body = json.dumps({"error": message}).encode("utf-8")
+    start_response(STATUS_LINES[status], [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+    return [body]
+
+
+def app(environ, start_response):
+    """WSGI application serving the endpoints.
+
+    Args:
+        environ (dict): WSGI environment.
+        start_response (callable): WSGI start_response.
+
+    Returns:
+        list: WSGI body.
+    """
+    method = environ.get("REQUEST_METHOD", "GET")
+    path = environ.get("PATH_INFO", "/").rstrip("/") or "/"
+    if method not in ("GET", "HEAD"):
+        return error_response(start_response, 405, "only GET and HEAD are supported")
+
+    if path == "/health":
+        start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+        return [b"ok"]
+    if path == "/metrics" and instrumentation.ENABLED:
+        body = instrumentation.render_prometheus().encode("utf-8")
+        start_response("200 OK", [("Content-Type", "text/plain; version=0.0.4"), ("Content-Length", str(len(body)))])
+        return [body]
+    endpoint = ENDPOINTS.get(path)
+    if endpoint is None:
+        return error_response(start_response, 404, f"unknown endpoint {path}, use one of {', '.join(ENDPOINTS)}")
+
+    query_string = environ.get("QUERY_STRING", "")
+    query = parse_qs(query_string)
+    try:
+        response_format = choose_format(query, environ.get("HTTP_ACCEPT"))
+        with timed("service" + path.replace("/", "_")):  # e.g. "service_series"
+            etag, body = get_cached_response(
+                (path, query_string, response_format),
+                lambda: serialize(endpoint(query), response_format)
+            )
+    except HTTPError as error:
+        return error_response(start_response, error.status, str(error))
+    except data_api.BadRequestError as error:
+        return error_response(start_response, 400, str(error))
+    except data_api.NotFoundError as error:
+        return error_response(start_response, 404, str(error))
+    except requests.RequestException as error:
+        return error_response(start_response, 502, f"World Bank API request failed: {error}")
+
+    headers = [("ETag", etag), ("Cache-Control", f"public, max-age={MAX_AGE}"), ("Vary", "Accept")]
+    if etag_matches(etag, environ.get("HTTP_IF_NONE_MATCH")):
+        instrumentation.increment("service_not_modified_total", endpoint=path)
+        start_response("304 Not Modified", headers)
+        return []
+    headers += [("Content-Type", CONTENT_TYPES[response_format]), ("Content-Length", str(len(body)))]
+    start_response("200 OK", headers)
+    return [] if method == "HEAD" else [body]
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """WSGI server handling every request on its own thread."""
+
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    """Request handler without the per-request log lines."""
+
+    def log_message(self, format, *args):
+        """Silence the per-request log lines."""
+
+
+def serve(host="127.0.0.1", port=8502, access_log=False):
+    """Run the service with the built-in threaded server until interrupted.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        access_log (bool): Print a line for every request.
+    """
+    handler = WSGIRequestHandler if access_log else QuietHandler
+    with make_server(host, port, app, server_class=ThreadingWSGIServer, handler_class=handler) as server:
+        print(f"Serving on http://{host}:{port}")
+        server.serve_forever()
+
+
+def main():
+    """Parse the command line and run the service."""
+    parser = argparse.ArgumentParser(description="Serve countries, indicator series and tables over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8502, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--access-log", action="store_true", help="print a line for every request")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.access_log)
+
+
+if __name__ == "__main__":
+    main()
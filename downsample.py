@@ -0,0 +1,100 @@
+"""Module for downsampling chart series before they are sent to the browser."""
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """Pick the points of a series to keep with Largest-Triangle-Three-Buckets (LTTB).
+
+    LTTB keeps the first and last points and, for every bucket in between, the point that
+    forms the largest triangle with the point kept in the previous bucket and the average
+    of the next bucket, which preserves the visual shape (peaks and dips) of the series.
+
+    Args:
+        x (np.ndarray): Sorted x values of the series, without NaN.
+        y (np.ndarray): y values of the series, without NaN.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # bucket edges for the points between the first and the last one
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else length
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        # twice the triangle areas of every candidate in the bucket, computed at once
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        kept[bucket + 1] = previous
+    return kept
+
+
+def segment_indices(x, y, threshold):
+    """Pick the points of a series with gaps to keep, downsampling every segment on its own.
+
+    Each contiguous run of values gets a share of the threshold proportional to its length,
+    and the first missing value after every run but the last is kept, so the chart still
+    breaks the line there instead of joining the runs across the gap.
+
+    Args:
+        x (np.ndarray): Sorted x values of the series.
+        y (np.ndarray): y values of the series, NaN for missing values.
+        threshold (int): Number of points to keep, approximately when there are gaps.
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep.
+    """
+    present = np.flatnonzero(~np.isnan(y))
+    if len(present) == len(y):
+        return lttb_indices(x, y, threshold)
+    if not len(present):
+        return present
+    segments = np.split(present, np.flatnonzero(np.diff(present) > 1) + 1)
+    kept = []
+    for i, segment in enumerate(segments):
+        budget = max(round(threshold * len(segment) / len(present)), 3)
+        kept.append(segment[lttb_indices(x[segment], y[segment], budget)])
+        if i < len(segments) - 1:
+            kept.append(segment[-1:] + 1)  # the missing value that breaks the line
+    return np.concatenate(kept)
+
+
+def decimate_long(long_df, threshold, x='Year', y='Value', group='Country'):
+    """Downsample every series of a long dataframe to about `threshold` points.
+
+    Missing values inside a series split it into segments that are downsampled separately,
+    and one missing value is kept between them so gaps stay visible (see segment_indices).
+
+    Args:
+        long_df (pd.DataFrame): Long dataframe with numeric x values, sorted by x within each group.
+        threshold (int): Number of points to keep per series.
+        x (str): Column of the x values.
+        y (str): Column of the y values.
+        group (str): Column identifying each series.
+
+    Returns:
+        pd.DataFrame: Dataframe with the kept rows only.
+    """
+    x_values = long_df[x].to_numpy()
+    y_values = long_df[y].to_numpy(dtype=np.float64)
+    positions = []
+    for rows in long_df.groupby(group, sort=False).indices.values():
+        positions.append(rows[segment_indices(x_values[rows], y_values[rows], threshold)])
+    if not positions:
+        return long_df
+    return long_df.iloc[np.concatenate(positions)]
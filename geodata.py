@@ -0,0 +1,87 @@
+"""Module for the static geodata table of every country.
+
+The country list keeps latitude and longitude as the strings the API returns. The table
+parses them once per process into one float32 (country, 2) array, shared read-only by
+every session, with a pandas Index over the country names, so the map points of a
+selection are a single get_indexer lookup plus one fancy index instead of a loop. Only
+the table is float32: the points handed to st.map are float64, which it can serialize.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from country_snapshot import load_countries
+
+COLOR_BY = {"region": "Region", "income_level": "Income level"}  # country metadata keys -> legend titles
+
+
+class GeoTable:
+    """Typed coordinates and metadata of every country."""
+
+    def __init__(self, countries):
+        """Parse the coordinates and metadata of every country.
+
+        Args:
+            countries (dict): Countries as returned by fetch_countries.
+        """
+        self.names = pd.Index(list(countries), name='Country')
+        self.ids = np.array([country['id'] for country in countries.values()], dtype=object)
+        # missing or empty coordinates become NaN, numpy parses the numeric strings directly
+        self.coordinates = np.array([
+            (country.get('latitude') or 'nan', country.get('longitude') or 'nan')
+            for country in countries.values()
+        ], dtype=np.float32).reshape(-1, 2)
+        self.coordinates.flags.writeable = False  # sessions share this array, nobody may modify it
+        self.metadata = {
+            key: [country.get(key) or "Unknown" for country in countries.values()]
+            for key in COLOR_BY
+        }
+
+    def rows(self, selected_countries):
+        """Find the table rows of selected countries.
+
+        Args:
+            selected_countries (list): Country names.
+
+        Returns:
+            np.ndarray: Row of every known country, in selection order.
+        """
+        rows = self.names.get_indexer(selected_countries)
+        return rows[rows >= 0]
+
+    def points(self, selected_countries):
+        """Get the map points of selected countries.
+
+        Args:
+            selected_countries (list): Country names.
+
+        Returns:
+            pd.DataFrame: float64 "latitude" and "longitude" columns, countries without
+                coordinates left out.
+        """
+        coordinates = self.coordinates[self.rows(selected_countries)]
+        coordinates = coordinates[~np.isnan(coordinates).any(axis=1)]
+        # st.map serializes the points with json, which can't encode float32 numbers
+        return pd.DataFrame(coordinates.astype(np.float64), columns=['latitude', 'longitude'])
+
+    def frame(self):
+        """Get every country's id, name and metadata, for a choropleth.
+
+        Returns:
+            pd.DataFrame: "id", "Country" and one column per COLOR_BY label.
+        """
+        return pd.DataFrame({
+            "id": self.ids,
+            "Country": self.names,
+            **{label: self.metadata[key] for key, label in COLOR_BY.items()}
+        })
+
+
+@st.cache_resource
+def get_geodata():
+    """Build the geodata table once per process.
+
+    Returns:
+        GeoTable: Table of every country in the country list.
+    """
+    return GeoTable(load_countries())
@@ -0,0 +1,191 @@
+"""Module for the persistent on-disk cache of indicator series.
+
+Series are stored in a SQLite file keyed by (country id, indicator code). SQLite lets every
+app server process on the machine share the same cache, so a restart doesn't re-download
+everything. Years and values are stored as packed arrays (int16 years, float64 values with
+NaN for missing data) instead of JSON to keep the file small and reads copy-free.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+CACHE_PATH = os.environ.get(
+    "INDICATOR_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "indicator_cache.sqlite")
+)
+CACHE_TTL = float(os.environ.get("INDICATOR_CACHE_TTL", str(24 * 60 * 60)))  # seconds before an entry is revalidated
+CACHE_MAX_ENTRIES = int(os.environ.get("INDICATOR_CACHE_MAX_ENTRIES", "20000"))  # least recently used entries are evicted past this
+OFFLINE = os.environ.get("COUNTRYDATA_OFFLINE", "0") == "1"  # never call the API, serve whatever is cached
+
+_local = threading.local()  # sqlite connections can't be shared between threads
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    country_id TEXT NOT NULL,
+    indicator TEXT NOT NULL,
+    years BLOB NOT NULL,
+    vals BLOB NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    source_url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    PRIMARY KEY (country_id, indicator)
+);
+CREATE INDEX IF NOT EXISTS series_accessed_at ON series (accessed_at);
+"""
+
+
+def get_connection():
+    """Get this thread's connection to the cache database, creating the file if needed.
+
+    Returns:
+        sqlite3.Connection: Connection in WAL mode so readers don't block the writer.
+    """
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        connection = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        _local.connection = connection
+    return connection
+
+
+def encode_series(dates, values):
+    """Pack dates and values into compact binary blobs.
+
+    Args:
+        dates (np.ndarray): int16 years.
+        values (np.ndarray): float64 values, NaN for missing data.
+
+    Returns:
+        tuple: (years blob, values blob).
+    """
+    return np.asarray(dates, dtype=np.int16).tobytes(), np.asarray(values, dtype=np.float64).tobytes()
+
+
+def decode_series(years_blob, vals_blob):
+    """Unpack blobs written by encode_series back into arrays.
+
+    Args:
+        years_blob (bytes): Packed int16 years.
+        vals_blob (bytes): Packed float64 values.
+
+    Returns:
+        dict: Dictionary with read-only "dates" and "values" arrays, the same shape the API fetch returns.
+    """
+    return {
+        "dates": np.frombuffer(years_blob, dtype=np.int16),
+        "values": np.frombuffer(vals_blob, dtype=np.float64)
+    }
+
+
+def is_fresh(entry, now=None):
+    """Check if a cache entry is younger than the TTL.
+
+    Args:
+        entry (dict): Entry returned by get_entries.
+        now (float): Current time, defaults to time.time().
+
+    Returns:
+        bool: True if the entry can be served without revalidation.
+    """
+    now = time.time() if now is None else now
+    return now - entry["fetched_at"] < CACHE_TTL
+
+
+def get_entries(indicator, country_ids):
+    """Read cached series for several countries and mark them as recently used.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        country_ids (list): ISO3 country codes.
+
+    Returns:
+        dict: Dictionary mapping the cached country ids to entries with "dates", "values",
+            "fetched_at", "source_url", "etag" and "last_modified".
+    """
+    if not country_ids:
+        return {}
+    connection = get_connection()
+    placeholders = ",".join("?" * len(country_ids))
+    rows = connection.execute(
+        f"SELECT country_id, years, vals, fetched_at, source_url, etag, last_modified FROM series "
+        f"WHERE indicator = ? AND country_id IN ({placeholders})",
+        [indicator, *country_ids]
+    ).fetchall()
+    entries = {}
+    for country_id, years_blob, vals_blob, fetched_at, source_url, etag, last_modified in rows:
+        entry = decode_series(years_blob, vals_blob)
+        entry.update(fetched_at=fetched_at, source_url=source_url, etag=etag, last_modified=last_modified)
+        entries[country_id] = entry
+    if entries:
+        connection.execute(
+            f"UPDATE series SET accessed_at = ? WHERE indicator = ? AND country_id IN ({','.join('?' * len(entries))})",
+            [time.time(), indicator, *entries]
+        )
+    return entries
+
+
+def put_entries(indicator, series_by_id, source_url=None, etag=None, last_modified=None):
+    """Store freshly downloaded series, then evict the least recently used entries.
+
+    Args:
+        indicator (str): World Bank indicator code.
+        series_by_id (dict): Dictionary mapping country ids to "dates" and "values" arrays.
+        source_url (str): URL of the request the series came from, used for revalidation.
+        etag (str): ETag header of that response, if any.
+        last_modified (str): Last-Modified header of that response, if any.
+    """
+    if not series_by_id:
+        return
+    now = time.time()
+    rows = [
+        (country_id, indicator, *encode_series(series["dates"], series["values"]), now, now, source_url, etag, last_modified)
+        for country_id, series in series_by_id.items()
+    ]
+    connection = get_connection()
+    connection.executemany("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    evict()
+
+
+def touch_entries(indicator, country_ids):
+    """Mark entries as fresh again after the API confirmed they haven't changed (HTTP 304).
+
+    Args:
+        indicator (str): World Bank indicator code.
+        country_ids (list): ISO3 country codes.
+    """
+    if not country_ids:
+        return
+    now = time.time()
+    get_connection().execute(
+        f"UPDATE series SET fetched_at = ?, accessed_at = ? WHERE indicator = ? AND country_id IN ({','.join('?' * len(country_ids))})",
+        [now, now, indicator, *country_ids]
+    )
+
+
+def evict(max_entries=None):
+    """Delete the least recently used entries beyond the size bound.
+
+    Args:
+        max_entries (int): Number of entries to keep, defaults to CACHE_MAX_ENTRIES.
+    """
+    max_entries = CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    connection = get_connection()
+    (count,) = connection.execute("SELECT COUNT(*) FROM series").fetchone()
+    if count > max_entries:
+        connection.execute(
+            "DELETE FROM series WHERE rowid IN (SELECT rowid FROM series ORDER BY accessed_at ASC LIMIT ?)",
+            [count - max_entries]
+        )
+
+
+def clear():
+    """Delete every cached entry."""
+    get_connection().execute("DELETE FROM series")
@@ -82,3 +82,18 @@ def is_percentage_indicator(indicator_code):
         "EG.ELC.ACCS.ZS", "SP.RUR.TOTL.ZS", "SP.URB.TOTL.IN.ZS"
     ]
     return indicator_code in percentage_indicators
+
+
+def get_all_indicators():
+    """Get every indicator of every category.
+
+    Returns:
+        dict: Mapping of World Bank codes to their indicator names.
+    """
+    all_indicators = {}
+    for get_indicators in (get_economic_indicators, get_social_indicators,
+                           get_environmental_indicators, get_developmental_indicators):
+        for name, code in get_indicators().items():
+            if code:  # skips the empty "" placeholder option of each selectbox
+                all_indicators[code] = name
+    return all_indicators
@@ -0,0 +1,120 @@
+"""Module for the shared in-memory indicator cube.
+
+The cube is built once per process from the preloaded store and shared read-only by every
+Streamlit session. Country and year index maps turn a selection into array positions, and
+the first/last year with data of every (indicator, country) series is precomputed, so
+building the dashboard's Year x Country table is a lookup plus one gather instead of
+reprocessing the series on every rerun.
+"""
+import numpy as np
+import pandas as pd
+
+
+class IndicatorCube:
+    """Dense (indicator, country, year) array with precomputed index maps and year bounds."""
+
+    def __init__(self, values, indicators, countries, first_year):
+        """Create a cube and precompute its index maps and year bounds.
+
+        Args:
+            values (np.ndarray): Float64 array of shape (indicator, country, year), NaN for missing data.
+            indicators (list): Indicator codes, in cube order.
+            countries (dict): Countries as returned by fetch_countries, in cube order.
+            first_year (int): Year of the first position on the year axis.
+        """
+        self.values = np.array(values, dtype=np.float64)  # loads the memory-mapped store into memory
+        self.values.flags.writeable = False  # sessions share this array, nobody may modify it
+        self.indicator_index = {code: i for i, code in enumerate(indicators)}
+        self.country_index = {name: i for i, name in enumerate(countries)}
+        self.years = np.arange(first_year, first_year + self.values.shape[2])
+        self.year_index = {int(year): i for i, year in enumerate(self.years)}
+
+        has_data = ~np.isnan(self.values)
+        has_any = has_data.any(axis=2)
+        year_count = self.values.shape[2]
+        # argmax finds the first True along the year axis, on the reversed axis it finds the last one
+        self.first_valid = np.where(has_any, has_data.argmax(axis=2), -1)
+        self.last_valid = np.where(has_any, year_count - 1 - has_data[:, :, ::-1].argmax(axis=2), -1)
+
+    @classmethod
+    def from_store(cls, store):
+        """Build a cube from a loaded indicator store.
+
+        Args:
+            store (indicator_store.IndicatorStore): Store written by bulk_ingest.py.
+
+        Returns:
+            IndicatorCube: The cube holding every indicator of the store.
+        """
+        return cls(store.cube, store.indicators, store.countries, int(store.years[0]) if len(store.years) else 0)
+
+    def has(self, indicator, countries):
+        """Check if the cube holds an indicator for every selected country.
+
+        Args:
+            indicator (str): World Bank indicator code.
+            countries (list): Country names.
+
+        Returns:
+            bool: True if the selection can be served from the cube.
+        """
+        return indicator in self.indicator_index and all(country in self.country_index for country in countries)
+
+    def year_bounds(self, indicator, countries):
+        """Look up the first and last year with data over the selected countries.
+
+        Args:
+            indicator (str): World Bank indicator code.
+            countries (list): Country names.
+
+        Returns:
+            tuple: (min_year, max_year), or (None, None) if none of the countries has data.
+        """
+        i = self.indicator_index[indicator]
+        rows = [self.country_index[country] for country in countries]
+        first = self.first_valid[i, rows]
+        last = self.last_valid[i, rows]
+        with_data = first >= 0
+        if not with_data.any():
+            return None, None
+        return int(self.years[first[with_data].min()]), int(self.years[last[with_data].max()])
+
+    def slice(self, indicator, countries, start_year, end_year):
+        """Get the (country x year) values of a selection.
+
+        The year range is a plain slice of the year axis and the countries are gathered with
+        one fancy index, so only the selected rows are copied.
+
+        Args:
+            indicator (str): World Bank indicator code.
+            countries (list): Country names.
+            start_year (int): First year of the range (inclusive).
+            end_year (int): Last year of the range (inclusive).
+
+        Returns:
+            np.ndarray: Array of shape (len(countries), end_year - start_year + 1).
+        """
+        rows = [self.country_index[country] for country in countries]
+        start = self.year_index[start_year]
+        end = self.year_index[end_year] + 1
+        return self.values[self.indicator_index[indicator], :, start:end][rows]
+
+    def frame(self, indicator, countries):
+        """Build the dashboard's Year x Country dataframe for a selection.
+
+        Args:
+            indicator (str): World Bank indicator code.
+            countries (list): Country names.
+
+        Returns:
+            tuple: (df, min_year, max_year, country_count) or (None, None, None, country_count)
+                if no data, the same contract as process_indicator_data.
+        """
+        country_count = len(countries)
+        min_year, max_year = self.year_bounds(indicator, countries)
+        if min_year is None:
+            return None, None, None, country_count
+        block = self.slice(indicator, countries, min_year, max_year)
+        df = pd.DataFrame(block.T, columns=list(countries))
+        df.insert(0, 'Year', self.years[self.year_index[min_year]:self.year_index[max_year] + 1])
+        return df, min_year, max_year, country_count
@@ -0,0 +1,205 @@
+"""Module for building the dashboard's indicator table incrementally across reruns.
+
+Streamlit reruns the whole script on every widget interaction. The pipeline keeps, per
+indicator, the Year x Country frame of everything fetched so far in st.session_state, so:
+
+* an unchanged selection (e.g. only a year slider moved) returns the previous result with
+  no fetching or processing,
+* adding countries fetches and splices in only the new columns,
+* removing countries drops their columns.
+
+Countries that couldn't be fetched (API unreachable and nothing cached) get no column, and
+the selection isn't remembered, so they are fetched again on the next rerun. A state older
+than the cache's INDICATOR_CACHE_TTL, or built from an older preloaded store, is dropped, so
+a dashboard left open goes back through the cache's revalidation instead of keeping old data.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import indicator_cache
+import instrumentation
+from data_fetcher import fetch_indicator_data, get_cube, get_store_version
+from data_processor import build_year_matrix
+from instrumentation import timed
+
+
+def new_state(store_version=None, version=0):
+    """Create the empty pipeline state of one indicator.
+
+    Args:
+        store_version (str): Version of the preloaded store the state is built from.
+        version (int): First result version, carried over from a dropped state so chart
+            keys of its results are never reused.
+
+    Returns:
+        dict: State holding the Year-indexed frame, each column's year bounds, and the last
+            selection with its result.
+    """
+    return {
+        "frame": pd.DataFrame(index=pd.Index([], dtype=np.int64, name='Year')),
+        "bounds": {},  # country -> (first year, last year) with data, or None if it has no data
+        "missing": [],  # selected countries that couldn't be fetched by the last load
+        "selection": None,
+        "result": None,
+        "version": version,  # bumped whenever the result changes, used as the cache key of charts built from it
+        "store_version": store_version,
+        "built_at": time.monotonic()  # the columns are refetched once this is older than the cache TTL
+    }
+
+
+def is_stale(state, store_version):
+    """Check whether a pipeline state must be rebuilt from scratch.
+
+    Args:
+        state (dict): Pipeline state of an indicator.
+        store_version (str): Current version of the preloaded store.
+
+    Returns:
+        bool: True if the state is older than the cache TTL or was built from another store.
+    """
+    return (state["store_version"] != store_version
+            or time.monotonic() - state["built_at"] >= indicator_cache.CACHE_TTL)
+
+
+def column_bounds(years, matrix):
+    """Find the first and last year with data of every column of a Year x Country matrix.
+
+    Args:
+        years (np.ndarray): Sorted years of the matrix rows.
+        matrix (np.ndarray): Float64 matrix of shape (len(years), country count).
+
+    Returns:
+        list: (first year, last year) for every column, or None for columns without data.
+    """
+    has_data = ~np.isnan(matrix)
+    has_any = has_data.any(axis=0)
+    first = has_data.argmax(axis=0)
+    last = len(years) - 1 - has_data[::-1].argmax(axis=0)
+    return [
+        (int(years[first[i]]), int(years[last[i]])) if has_any[i] else None
+        for i in range(matrix.shape[1])
+    ]
+
+
+def splice_countries(state, added_countries, countries_dict, indicator):
+    """Fetch countries that aren't in the state yet and add them as new columns.
+
+    Args:
+        state (dict): Pipeline state of the indicator.
+        added_countries (list): Country names to add.
+        countries_dict (dict): Dictionary of country data.
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        list: Added countries that couldn't be fetched, left out of the frame.
+    """
+    indicator_data = fetch_indicator_data(added_countries, countries_dict=countries_dict, indicator=indicator)
+    years, matrix = build_year_matrix(indicator_data)
+    new_columns = pd.DataFrame(matrix, index=pd.Index(years, name='Year'), columns=list(indicator_data.keys()))
+    # the outer join only realigns the rows when the new countries bring years the frame didn't have
+    state["frame"] = state["frame"].join(new_columns, how='outer')
+    state["bounds"].update(zip(indicator_data.keys(), column_bounds(years, matrix), strict=True))
+    return [country for country in added_countries if country not in indicator_data]
+
+
+def trim_frame(state, selected_countries):
+    """Cut the state's frame down to the selected columns and the years with data.
+
+    Args:
+        state (dict): Pipeline state of the indicator.
+        selected_countries (list): List of country names, in display order.
+
+    Returns:
+        tuple: (df, min_year, max_year, country_count) or (None, None, None, country_count) if no data.
+            Countries without a column (they couldn't be fetched) are left out of df.
+    """
+    country_count = len(selected_countries)
+    loaded_countries = [country for country in selected_countries if country in state["bounds"]]
+    bounds = [state["bounds"][country] for country in loaded_countries if state["bounds"][country] is not None]
+    if not bounds:
+        # no country has a single value for the selected indicator
+        return None, None, None, country_count
+
+    min_value = min(first for first, _ in bounds)
+    max_value = max(last for _, last in bounds)
+    df = state["frame"].loc[min_value:max_value, loaded_countries].reset_index()
+    return df, min_value, max_value, country_count
+
+
+@timed("load_indicator_frame")
+def load_indicator_frame(selected_countries, countries_dict, indicator):
+    """Get the Year x Country dataframe of the selected countries for an indicator.
+
+    Args:
+        selected_countries (list): List of country names.
+        countries_dict (dict): Dictionary of country data.
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        tuple: (df, min_year, max_year, country_count) or (None, None, None, country_count)
+            if no data, the same contract as process_indicator_data.
+    """
+    frames = st.session_state.setdefault("indicator_frames", {})
+    store_version = get_store_version()
+    state = frames.get(indicator)
+    if state is None or is_stale(state, store_version):
+        # start over, so every column is fetched again through the cache's TTL and ETag checks
+        state = frames[indicator] = new_state(store_version, state["version"] if state else 0)
+    selection = tuple(selected_countries)
+    if state["selection"] == selection:
+        instrumentation.increment("cache_lookups_total", cache="session", result="hit")
+        return state["result"]  # nothing changed but a widget that doesn't affect the data
+    instrumentation.increment("cache_lookups_total", cache="session", result="miss")
+
+    cube = get_cube()
+    if cube is not None and cube.has(indicator, selected_countries):
+        # preloaded data is sliced straight out of the shared cube, no fetching or processing needed
+        result = cube.frame(indicator, selected_countries)
+        missing = []
+    else:
+        removed_countries = [country for country in state["bounds"] if country not in selected_countries]
+        if removed_countries:
+            state["frame"] = state["frame"].drop(columns=removed_countries)
+            for country in removed_countries:
+                del state["bounds"][country]
+        added_countries = [country for country in selected_countries if country not in state["bounds"]]
+        missing = splice_countries(state, added_countries, countries_dict, indicator) if added_countries else []
+        result = trim_frame(state, selected_countries)
+
+    # a selection with missing countries isn't remembered, so the next rerun fetches them again
+    state["selection"] = None if missing else selection
+    state["missing"] = missing
+    state["result"] = result
+    state["version"] += 1
+    return result
+
+
+def missing_countries(indicator):
+    """Get the selected countries the last load of an indicator couldn't fetch.
+
+    Args:
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        list: Country names, empty if every country was loaded.
+    """
+    return st.session_state["indicator_frames"][indicator]["missing"]
+
+
+def get_data_key(indicator):
+    """Get a key that identifies the current result of an indicator.
+
+    The key changes every time load_indicator_frame builds a new result, so anything derived
+    from the result (e.g. chart figures) can be cached under it.
+
+    Args:
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        tuple: (indicator, version).
+    """
+    state = st.session_state["indicator_frames"][indicator]
+    return indicator, state["version"]
@@ -0,0 +1,274 @@
+"""Module for the columnar store of preloaded indicator data.
+
+The store is written by bulk_ingest.py and holds every configured indicator for every
+country as one NumPy cube of shape (indicator, country, year), next to a small JSON file
+with the country list, indicator codes and first year. The cube is memory-mapped when
+loaded, so reading a series doesn't load the whole file and the dashboard doesn't need
+any network call for indicators that are in the store.
+
+Every ingestion writes a new version directory and then switches the CURRENT pointer file
+to it with a single rename, so readers always see a cube and metadata that belong together,
+and running apps notice the new version the next time they read the pointer.
+
+NumPy is imported by the functions that need it, so reading the store's country list
+(read_countries) doesn't load it before the dashboard's first paint.
+"""
+import functools
+import json
+import os
+import shutil
+import time
+
+STORE_DIR = os.environ.get(
+    "INDICATOR_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".store")
+)
+CUBE_FILE = "cube.npy"
+METADATA_FILE = "metadata.json"
+CURRENT_FILE = "CURRENT"  # holds the name of the version directory in use
+KEEP_VERSIONS = 2  # the current version and the one before it, which running apps may still have mapped
+
+
+class IndicatorStore:
+    """Read-only view of a store written by write_store."""
+
+    def __init__(self, cube, metadata, version=None):
+        """Create a store from a loaded cube and its metadata.
+
+        Args:
+            cube (np.ndarray): Float64 array of shape (indicator, country, year), NaN for missing data.
+            metadata (dict): Metadata written next to the cube.
+            version (str): Name of the version directory the store was loaded from.
+        """
+        import numpy as np
+
+        self.cube = cube
+        self.version = version
+        self.countries = metadata["countries"]  # same shape as fetch_countries()
+        self.indicators = metadata["indicators"]
+        self.country_ids = metadata["country_ids"]
+        self.years = np.arange(metadata["first_year"], metadata["first_year"] + cube.shape[2])
+        self.created_at = metadata.get("created_at")
+        self.indicator_index = {code: i for i, code in enumerate(self.indicators)}
+        self.country_index = {country_id: i for i, country_id in enumerate(self.country_ids)}
+
+    def has_indicator(self, indicator):
+        """Check if an indicator was ingested into the store.
+
+        Args:
+            indicator (str): World Bank indicator code.
+
+        Returns:
+            bool: True if the store holds the indicator.
+        """
+        return indicator in self.indicator_index
+
+    def has_countries(self, country_ids):
+        """Check if every country was ingested into the store.
+
+        Args:
+            country_ids (list): ISO3 country codes.
+
+        Returns:
+            bool: True if the store holds all of the countries.
+        """
+        return all(country_id in self.country_index for country_id in country_ids)
+
+    def indicator_data(self, selected_countries, indicator):
+        """Read indicator data for selected countries from the store.
+
+        Args:
+            selected_countries (list): List of country names.
+            indicator (str): World Bank indicator code.
+
+        Returns:
+            dict: Dictionary mapping country names to their dates and values arrays, the
+                same shape fetch_indicator_data returns.
+        """
+        rows = self.cube[self.indicator_index[indicator]]
+        return {
+            country: {"dates": self.years, "values": rows[self.country_index[self.countries[country]['id']]]}
+            for country in selected_countries
+        }
+
+
+def build_cube(series_by_indicator, indicators, country_ids):
+    """Scatter downloaded series into a dense (indicator, country, year) cube.
+
+    Args:
+        series_by_indicator (dict): Dictionary mapping indicator codes to dictionaries of
+            country id -> "dates" and "values" arrays.
+        indicators (list): Indicator codes, in cube order.
+        country_ids (list): ISO3 country codes, in cube order.
+
+    Returns:
+        tuple: (cube, first_year).
+    """
+    import numpy as np
+
+    year_ranges = [
+        (int(series["dates"].min()), int(series["dates"].max()))
+        for series_by_id in series_by_indicator.values()
+        for series in series_by_id.values()
+        if len(series["dates"])
+    ]
+    first_year = min(first for first, _ in year_ranges) if year_ranges else 0
+    year_count = max(last for _, last in year_ranges) - first_year + 1 if year_ranges else 0
+    country_index = {country_id: i for i, country_id in enumerate(country_ids)}
+
+    cube = np.full((len(indicators), len(country_ids), year_count), np.nan)
+    for i, indicator in enumerate(indicators):
+        for country_id, series in series_by_indicator.get(indicator, {}).items():
+            if country_id not in country_index or not len(series["dates"]):
+                continue
+            year_positions = series["dates"].astype(np.int64) - first_year
+            cube[i, country_index[country_id], year_positions] = series["values"]
+    return cube, first_year
+
+
+def current_version(store_dir=None):
+    """Read which version of the store is in use.
+
+    Args:
+        store_dir (str): Directory of the store, defaults to STORE_DIR.
+
+    Returns:
+        str: Name of the current version directory, or None if no store has been written.
+    """
+    try:
+        with open(os.path.join(store_dir or STORE_DIR, CURRENT_FILE), encoding="utf-8") as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def remove_old_versions(store_dir, keep=KEEP_VERSIONS):
+    """Delete all but the newest version directories of a store.
+
+    Args:
+        store_dir (str): Directory of the store.
+        keep (int): Number of versions to keep, the current one included.
+    """
+    versions = sorted(name for name in os.listdir(store_dir)
+                      if name.startswith("v") and os.path.isdir(os.path.join(store_dir, name)))
+    current = current_version(store_dir)
+    for name in versions[:-keep]:
+        if name != current:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+
+def write_store(countries, series_by_indicator, indicators, store_dir=None, created_at=None):
+    """Write a new version of the store to disk and switch to it.
+
+    The cube and metadata are written to a fresh version directory, then the CURRENT
+    pointer is replaced atomically, so an app reading the store during an ingestion sees
+    either the previous version or the new one, never a mix of both.
+
+    Args:
+        countries (dict): Countries as returned by fetch_countries.
+        series_by_indicator (dict): Dictionary mapping indicator codes to dictionaries of
+            country id -> "dates" and "values" arrays.
+        indicators (list): Indicator codes to write, in cube order.
+        store_dir (str): Directory of the store, defaults to STORE_DIR.
+        created_at (float): Timestamp saved in the metadata.
+
+    Returns:
+        str: Directory the store was written to.
+    """
+    import numpy as np
+
+    store_dir = store_dir or STORE_DIR
+    version = f"v{time.time_ns()}"  # sorts by creation time
+    version_dir = os.path.join(store_dir, version)
+    os.makedirs(version_dir)
+    country_ids = [country['id'] for country in countries.values()]
+    cube, first_year = build_cube(series_by_indicator, indicators, country_ids)
+
+    with open(os.path.join(version_dir, CUBE_FILE), "wb") as file:
+        np.save(file, cube)
+    metadata = {
+        "countries": countries,
+        "country_ids": country_ids,
+        "indicators": list(indicators),
+        "first_year": first_year,
+        "created_at": created_at
+    }
+    with open(os.path.join(version_dir, METADATA_FILE), "w", encoding="utf-8") as file:
+        json.dump(metadata, file)
+
+    current_path = os.path.join(store_dir, CURRENT_FILE)
+    with open(current_path + ".tmp", "w", encoding="utf-8") as file:
+        file.write(version)
+    os.replace(current_path + ".tmp", current_path)  # the switch to the new version
+    remove_old_versions(store_dir)
+    return store_dir
+
+
+def load_store(store_dir=None):
+    """Load the current version of the store from disk.
+
+    Args:
+        store_dir (str): Directory of the store, defaults to STORE_DIR.
+
+    Returns:
+        IndicatorStore: The memory-mapped store, or None if no store has been written.
+    """
+    import numpy as np
+
+    store_dir = store_dir or STORE_DIR
+    version = current_version(store_dir)
+    version_dir = version_path(store_dir, version)
+    cube_path = os.path.join(version_dir, CUBE_FILE)
+    metadata_path = os.path.join(version_dir, METADATA_FILE)
+    if not (os.path.exists(cube_path) and os.path.exists(metadata_path)):
+        return None
+    with open(metadata_path, encoding="utf-8") as file:
+        metadata = json.load(file)
+    cube = np.load(cube_path, mmap_mode="r")
+    return IndicatorStore(cube, metadata, version)
+
+
+def version_path(store_dir, version):
+    """Get the directory holding the files of a store version.
+
+    Args:
+        store_dir (str): Directory of the store.
+        version (str): Version name, None for a store written before versioning.
+
+    Returns:
+        str: The version directory, or store_dir itself for an unversioned store.
+    """
+    # stores written before versioning have their files directly in the store directory
+    return os.path.join(store_dir, version) if version else store_dir
+
+
+def read_countries(store_dir=None):
+    """Read the country list of the current store version from its metadata only.
+
+    Args:
+        store_dir (str): Directory of the store, defaults to STORE_DIR.
+
+    Returns:
+        dict: Countries as stored by write_store, or None if no store has been written.
+    """
+    store_dir = store_dir or STORE_DIR
+    version = current_version(store_dir)
+    return read_version_countries(os.path.join(version_path(store_dir, version), METADATA_FILE), version)
+
+
+@functools.lru_cache(maxsize=2)
+def read_version_countries(metadata_path, version):
+    """Read and cache the country list of one store version.
+
+    Args:
+        metadata_path (str): Metadata file of the version.
+        version (str): Version name, part of the cache key.
+
+    Returns:
+        dict: Countries, or None if the file doesn't exist (shared, must not be modified).
+    """
+    try:
+        with open(metadata_path, encoding="utf-8") as file:
+            return json.load(file)["countries"]
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,263 @@
+"""Module for measuring the hot paths of the dashboard.
+
+Stages are timed with `timed`, either as a decorator or as a context manager, and events
+such as HTTP requests or cache hits are counted with `increment`. Metrics are kept in
+process-wide histograms and counters which can be exposed in the Prometheus text format
+(`render_prometheus`, or the HTTP endpoint started by `start_metrics_server`), appended
+to a JSONL log, and shown in the app's debug panel.
+
+Instrumentation is off unless COUNTRYDATA_METRICS=1. When it is off, `timed` returns
+decorated functions unchanged and every other call returns right away, so the overhead
+is negligible.
+"""
+import json
+import os
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("COUNTRYDATA_METRICS", "0") == "1"
+LOG_PATH = os.environ.get("COUNTRYDATA_METRICS_LOG")  # JSONL file every timing is appended to, if set
+METRICS_PORT = os.environ.get("COUNTRYDATA_METRICS_PORT")  # port of the Prometheus endpoint, if set
+METRICS_HOST = os.environ.get("COUNTRYDATA_METRICS_HOST", "127.0.0.1")  # interface of the endpoint, local only by default
+DEBUG_PANEL = os.environ.get("COUNTRYDATA_DEBUG_PANEL", "0") == "1"
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+PREFIX = "countrydata_"
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> {"buckets": [count per bucket], "sum": float, "count": int}
+_counters = {}  # (name, labels) -> value
+_server = None
+
+
+def label_key(labels):
+    """Turn keyword labels into a hashable, ordered key.
+
+    Args:
+        labels (dict): Label names and values.
+
+    Returns:
+        tuple: Sorted (name, value) pairs.
+    """
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def observe(name, value, **labels):
+    """Record a value (e.g. a duration in seconds or a payload size) in a histogram.
+
+    Args:
+        name (str): Metric name.
+        value (float): Observed value.
+        **labels: Label names and values.
+    """
+    if not ENABLED:
+        return
+    key = (name, label_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += value
+        histogram["count"] += 1
+    if LOG_PATH:
+        write_log({"time": time.time(), "metric": name, "value": value, **labels})
+
+
+def increment(name, amount=1, **labels):
+    """Add to a counter (e.g. HTTP requests, bytes received or cache hits).
+
+    Args:
+        name (str): Metric name.
+        amount (float): Amount to add.
+        **labels: Label names and values.
+    """
+    if not ENABLED:
+        return
+    key = (name, label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def write_log(record):
+    """Append one record to the JSONL log.
+
+    Args:
+        record (dict): Record to write.
+    """
+    line = json.dumps(record) + "\n"
+    with _lock:
+        with open(LOG_PATH, "a", encoding="utf-8") as file:
+            file.write(line)
+
+
+class timed:
+    """Time a stage into the "stage_seconds" histogram.
+
+    Can be used as a decorator (@timed("process")) or a context manager
+    (with timed("plotly_chart"): ...).
+    """
+
+    def __init__(self, stage):
+        """Create a timer.
+
+        Args:
+            stage (str): Name of the stage, used as the "stage" label.
+        """
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        if ENABLED:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if ENABLED and self.start is not None:
+            observe("stage_seconds", time.perf_counter() - self.start, stage=self.stage)
+
+    def __call__(self, func):
+        if not ENABLED:
+            return func  # nothing to measure, so the function isn't even wrapped
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe("stage_seconds", time.perf_counter() - start, stage=self.stage)
+        return wrapper
+
+
+def escape_label_value(value):
+    """Escape a label value for the Prometheus text format.
+
+    Args:
+        value (str): Label value.
+
+    Returns:
+        str: The value with backslashes, double quotes and newlines escaped.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels, extra=()):
+    """Format labels the way the Prometheus text format expects them.
+
+    Args:
+        labels (tuple): Sorted (name, value) pairs.
+        extra (tuple): Additional (name, value) pairs.
+
+    Returns:
+        str: Formatted labels, e.g. '{stage="process"}', or "" without labels.
+    """
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def render_prometheus():
+    """Render every metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics page.
+    """
+    with _lock:
+        histograms = {key: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+                      for key, h in _histograms.items()}
+        counters = dict(_counters)
+    lines = []
+    for metric in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {PREFIX}{metric} histogram")
+        for (name, labels), histogram in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram["buckets"], strict=True):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}{name}_bucket{format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{PREFIX}{name}_count{format_labels(labels)} {histogram['count']}")
+    for metric in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}{metric} counter")
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                lines.append(f"{PREFIX}{name}{format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Summarize every metric, for the debug panel.
+
+    Returns:
+        tuple: (histograms, counters) as lists of dictionaries.
+    """
+    with _lock:
+        histograms = [
+            {"metric": name, **dict(labels), "count": h["count"], "total": h["sum"],
+             "mean": h["sum"] / h["count"] if h["count"] else 0.0}
+            for (name, labels), h in sorted(_histograms.items())
+        ]
+        counters = [{"metric": name, **dict(labels), "value": value} for (name, labels), value in sorted(_counters.items())]
+    return histograms, counters
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves render_prometheus() on /metrics."""
+
+    def do_GET(self):
+        """Answer a scrape."""
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Silence the per-request log lines."""
+
+
+def start_metrics_server(port=None, host=None):
+    """Start the Prometheus endpoint on a background thread, once per process.
+
+    Args:
+        port (int): Port to listen on, defaults to COUNTRYDATA_METRICS_PORT.
+        host (str): Interface to listen on, defaults to COUNTRYDATA_METRICS_HOST.
+
+    Returns:
+        ThreadingHTTPServer: The running server, or None if metrics are off or no port is set.
+    """
+    global _server
+    port = port or METRICS_PORT
+    host = host or METRICS_HOST
+    if not ENABLED or not port:
+        return None
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def display_debug_panel():
+    """Display the collected metrics in an expander at the bottom of the app."""
+    if not (ENABLED and DEBUG_PANEL):
+        return
+    import streamlit as st
+
+    histograms, counters = snapshot()
+    with st.expander("Debug: performance metrics"):
+        st.dataframe(histograms, hide_index=True)
+        st.dataframe(counters, hide_index=True)
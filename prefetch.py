@@ -0,0 +1,136 @@
+"""Module for prefetching the indicators a user is likely to look at next.
+
+Once countries and a category are selected, the indicators of that category are almost
+always what the user opens next. The prefetcher warms the on-disk cache for them in the
+background, so switching indicators doesn't wait on the API:
+
+* jobs run on one small process-wide worker pool,
+* a (country, indicator) pair that is already being prefetched for another session isn't
+  fetched twice,
+* every session's jobs are cancelled when it schedules new ones (e.g. picks another
+  category), and
+* API calls are paced by a token bucket, so prefetching never floods the API.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import indicator_cache
+import instrumentation
+from data_fetcher import fetch_series_by_id, plan_batches
+from throttle import TokenBucket
+
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "2"))
+PREFETCH_RATE = float(os.environ.get("PREFETCH_RATE", "2"))  # API requests per second, across all sessions
+PREFETCH_BURST = float(os.environ.get("PREFETCH_BURST", "4"))
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "1") == "1"
+
+_log = logging.getLogger(__name__)
+_lock = threading.Lock()
+_executor = None
+_budget = TokenBucket(PREFETCH_RATE, PREFETCH_BURST)
+_in_flight = set()  # (indicator, country id) pairs being prefetched right now, by any session
+_sessions = {}  # session id -> (cancel event, futures of its jobs)
+
+
+def get_executor():
+    """Get the process-wide prefetch worker pool.
+
+    Returns:
+        ThreadPoolExecutor: The pool.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        return _executor
+
+
+def needs_fetch(country_ids, indicator):
+    """Find the countries whose cached series of an indicator are missing or expired.
+
+    Args:
+        country_ids (list): ISO3 country codes.
+        indicator (str): World Bank indicator code.
+
+    Returns:
+        list: Country ids that would need an API call.
+    """
+    entries = indicator_cache.get_entries(indicator, country_ids)
+    now = time.time()
+    return [
+        country_id for country_id in country_ids
+        if country_id not in entries or not indicator_cache.is_fresh(entries[country_id], now)
+    ]
+
+
+def prefetch_job(country_ids, indicator, cancelled):
+    """Warm the cache for one indicator, unless the job is cancelled before it calls the API.
+
+    Args:
+        country_ids (list): ISO3 country codes.
+        indicator (str): World Bank indicator code.
+        cancelled (threading.Event): Set when the session cancels its jobs.
+    """
+    if cancelled.is_set():
+        return
+    claimed = []
+    try:
+        stale_ids = needs_fetch(country_ids, indicator)
+        with _lock:
+            # another session may already be prefetching some of these pairs
+            claimed = [country_id for country_id in stale_ids if (indicator, country_id) not in _in_flight]
+            _in_flight.update((indicator, country_id) for country_id in claimed)
+        if not claimed:
+            return
+        _budget.acquire(len(plan_batches(claimed)))  # one token per API request the fetch will make
+        if cancelled.is_set():
+            return
+        fetch_series_by_id(claimed, indicator)
+        instrumentation.increment("prefetched_series_total", len(claimed))
+    except Exception:
+        # a failed prefetch only means the foreground fetch will do the work, but it's still worth seeing
+        _log.debug("prefetch of %s failed", indicator, exc_info=True)
+        instrumentation.increment("prefetch_failures_total")
+    finally:
+        with _lock:
+            _in_flight.difference_update((indicator, country_id) for country_id in claimed)
+
+
+def cancel(session_id):
+    """Cancel every prefetch job of a session.
+
+    Jobs that haven't started are dropped; running jobs stop before their next API call.
+
+    Args:
+        session_id (str): Id of the session.
+    """
+    with _lock:
+        cancelled, futures = _sessions.pop(session_id, (None, []))
+    if cancelled is not None:
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+
+
+def prefetch_indicators(session_id, country_ids, indicators):
+    """Replace a session's prefetch jobs with jobs for the given countries and indicators.
+
+    Args:
+        session_id (str): Id of the session (the jobs of its previous call are cancelled).
+        country_ids (list): ISO3 country codes.
+        indicators (list): World Bank indicator codes to warm.
+    """
+    cancel(session_id)
+    if not PREFETCH_ENABLED or indicator_cache.OFFLINE or not country_ids or not indicators:
+        return
+    cancelled = threading.Event()
+    executor = get_executor()
+    futures = [executor.submit(prefetch_job, list(country_ids), indicator, cancelled) for indicator in indicators]
+    with _lock:
+        # forget sessions whose jobs are all finished, so closed sessions don't pile up
+        for finished_id in [sid for sid, (_, jobs) in _sessions.items() if all(job.done() for job in jobs)]:
+            del _sessions[finished_id]
+        _sessions[session_id] = (cancelled, futures)
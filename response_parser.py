@@ -0,0 +1,269 @@
+"""Module for parsing World Bank indicator responses into typed arrays.
+
+Only the three fields the app uses (countryiso3code, date and value) are read, straight
+into preallocated arrays: int16 years and float64 values with NaN for missing data. Rows
+come grouped by country, so countries are kept as runs of (country id, first row) instead
+of one string per row.
+
+The fastest available JSON parser is used: orjson if it is installed, otherwise ijson
+(C backend only, it streams the body without building a dict per row), otherwise the
+standard library. COUNTRYDATA_JSON_PARSER can force one of "orjson", "ijson" or "json".
+
+Error payloads (the API answers some invalid requests with HTTP 200 and a "message" object
+instead of data) and malformed bodies raise ResponseError, so they are never cached as
+"no data".
+"""
+import io
+import json
+import os
+
+import numpy as np
+import requests
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+    if ijson.backend not in ("yajl2_c", "yajl2_cffi"):
+        ijson = ijson.get_backend("yajl2_c")
+except ImportError:
+    ijson = None
+
+PARSER = os.environ.get("COUNTRYDATA_JSON_PARSER", "auto")
+
+
+class ResponseError(requests.RequestException):
+    """Raised when a response is an API error payload or isn't a valid indicator response."""
+
+
+def empty_series():
+    """Create the series of a country without data.
+
+    Returns:
+        dict: Dictionary with empty "dates" and "values" arrays.
+    """
+    return {"dates": np.empty(0, dtype=np.int16), "values": np.empty(0, dtype=np.float64)}
+
+
+def page_size(metadata):
+    """Compute how many rows a page holds from its metadata.
+
+    Args:
+        metadata (dict): data[0] of a response.
+
+    Returns:
+        int: Number of rows on the page.
+    """
+    total = int(metadata.get("total") or 0)
+    per_page = int(metadata.get("per_page") or total)
+    page = int(metadata.get("page") or 1)
+    return max(0, min(per_page, total - (page - 1) * per_page))
+
+
+def error_text(message):
+    """Format the "message" of an API error payload.
+
+    Args:
+        message: data[0]["message"], usually a list of {"id", "key", "value"} objects.
+
+    Returns:
+        str: The messages' keys and values, e.g. "Invalid value: The provided parameter value is not valid".
+    """
+    if not isinstance(message, list):
+        return str(message)
+    return "; ".join(
+        ": ".join(str(item[field]) for field in ("key", "value") if item.get(field)) if isinstance(item, dict) else str(item)
+        for item in message
+    )
+
+
+def grow(array, size):
+    """Copy an array into a larger one, for rows beyond what the metadata announced.
+
+    Args:
+        array (np.ndarray): Array to grow.
+        size (int): Minimum size of the new array.
+
+    Returns:
+        np.ndarray: Array of at least `size` elements starting with the old ones.
+    """
+    grown = np.empty(max(size, 2 * len(array), 64), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def parse_rows(metadata, rows):
+    """Copy the needed fields of decoded rows into typed arrays.
+
+    Args:
+        metadata (dict): data[0] of the response.
+        rows (list): data[1] of the response (None when there are no rows).
+
+    Returns:
+        tuple: (metadata, runs, years, values), see parse_indicator_response.
+    """
+    if "message" in metadata:
+        raise ResponseError(f"the API answered with an error: {error_text(metadata['message'])}")
+    rows = rows or []
+    count = len(rows)
+    years = np.empty(count, dtype=np.int16)
+    values = np.empty(count, dtype=np.float64)
+    runs = []
+    current = None
+    for i, row in enumerate(rows):
+        country_id = row["countryiso3code"]
+        if country_id != current:
+            runs.append((country_id, i))
+            current = country_id
+        years[i] = int(row["date"])
+        value = row["value"]
+        values[i] = np.nan if value is None else value
+    return metadata, runs, years, values
+
+
+def parse_stream(body):
+    """Stream-parse a response with ijson, without building a dict per row.
+
+    Args:
+        body (bytes): Response body.
+
+    Returns:
+        tuple: (metadata, runs, years, values), see parse_indicator_response.
+    """
+    metadata = {}
+    messages = []
+    runs = []
+    years = values = None
+    i = -1
+    current = None
+    shape = []  # events of the top-level value and of its first element
+    fields = 0  # fields of the current row read so far, all three are required like in parse_rows
+    for prefix, event, value in ijson.parse(io.BytesIO(body), use_float=True):
+        if len(shape) < 2 and prefix in ("", "item"):
+            shape.append(event)
+        if prefix == "item.item" and event == "start_map":
+            i += 1
+            fields = 0
+            if i == len(years):
+                # more rows than the metadata announced, the arrays are grown instead of overflowing
+                years = grow(years, i + 1)
+                values = grow(values, i + 1)
+        elif prefix == "item.item" and event == "end_map":
+            if fields != 3:
+                raise ResponseError(f"row {i} lacks countryiso3code, date or value")
+        elif prefix == "item.item.countryiso3code":
+            fields += 1
+            if value != current:
+                runs.append((value, i))
+                current = value
+        elif prefix == "item.item.date":
+            fields += 1
+            years[i] = int(value)
+        elif prefix == "item.item.value":
+            fields += 1
+            values[i] = np.nan if value is None else value
+        elif prefix == "item" and event == "start_array":
+            # the rows array comes after the metadata, so its size is usually known here
+            size = page_size(metadata)
+            years = np.empty(size, dtype=np.int16)
+            values = np.empty(size, dtype=np.float64)
+        elif prefix.startswith("item.") and prefix.count(".") == 1 and event in ("string", "number", "boolean", "null"):
+            metadata[prefix[5:]] = value
+        elif prefix == "item.message" and event == "start_array":
+            metadata["message"] = messages
+        elif prefix == "item.message.item" and event == "start_map":
+            messages.append({})
+        elif prefix.startswith("item.message.item.") and messages:
+            messages[-1][prefix[len("item.message.item."):]] = value
+    if shape != ["start_array", "start_map"]:
+        raise ResponseError(f"unexpected response: {body[:200]!r}")  # the same bodies the other parsers reject
+    if "message" in metadata:
+        raise ResponseError(f"the API answered with an error: {error_text(metadata['message'])}")
+    if years is None:
+        return metadata, [], np.empty(0, dtype=np.int16), np.empty(0, dtype=np.float64)
+    return metadata, runs, years[:i + 1], values[:i + 1]
+
+
+def parse_indicator_response(body):
+    """Parse one page of an indicator response.
+
+    Args:
+        body (bytes): Response body.
+
+    Returns:
+        tuple: (metadata, runs, years, values) where metadata is data[0], runs lists
+            (country id, first row) for every run of consecutive rows of one country,
+            years is an int16 array and values a float64 array with NaN for missing data.
+
+    Raises:
+        ResponseError: If the body is an API error payload or not a valid indicator response.
+    """
+    parser = PARSER
+    if parser == "auto":
+        parser = "orjson" if orjson is not None else "ijson" if ijson is not None else "json"
+    try:
+        if parser == "ijson":
+            return parse_stream(body)
+        data = orjson.loads(body) if parser == "orjson" else json.loads(body)
+        if not isinstance(data, list) or not data or not isinstance(data[0], dict):
+            raise ResponseError(f"unexpected response: {body[:200]!r}")
+        return parse_rows(data[0], data[1] if len(data) > 1 else None)
+    except ResponseError:
+        raise
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError) as error:
+        raise ResponseError(f"malformed response: {error}") from error
+    except Exception as error:
+        if ijson is not None and isinstance(error, ijson.JSONError):
+            raise ResponseError(f"malformed response: {error}") from error
+        raise
+
+
+def merge_pages(pages):
+    """Concatenate parsed pages of one request.
+
+    Args:
+        pages (list): Results of parse_indicator_response, in page order.
+
+    Returns:
+        tuple: (runs, years, values) over all pages, a country split across two pages
+            being one run.
+    """
+    runs = []
+    offset = 0
+    for _, page_runs, page_years, _ in pages:
+        for country_id, start in page_runs:
+            if not (runs and runs[-1][0] == country_id):
+                runs.append((country_id, start + offset))
+        offset += len(page_years)
+    if len(pages) == 1:
+        return runs, pages[0][2], pages[0][3]
+    years = np.concatenate([page[2] for page in pages]) if pages else np.empty(0, dtype=np.int16)
+    values = np.concatenate([page[3] for page in pages]) if pages else np.empty(0, dtype=np.float64)
+    return runs, years, values
+
+
+def split_series(runs, years, values):
+    """Split parsed rows into per-country series.
+
+    Args:
+        runs (list): (country id, first row) of every country.
+        years (np.ndarray): int16 years of every row.
+        values (np.ndarray): float64 values of every row.
+
+    Returns:
+        dict: Dictionary mapping ISO3 country codes to their "dates" and "values" arrays
+            (views into the parsed arrays, no copy, unless a country's rows weren't
+            contiguous and its runs had to be joined).
+    """
+    series = {}
+    ends = [start for _, start in runs[1:]] + [len(years)]
+    for (country_id, start), end in zip(runs, ends, strict=True):
+        part = {"dates": years[start:end], "values": values[start:end]}
+        if country_id in series:
+            # the API groups rows by country, but a later run must extend the series, not replace it
+            part = {key: np.concatenate([series[country_id][key], part[key]]) for key in part}
+        series[country_id] = part
+    return series
@@ -0,0 +1,114 @@
+"""Module for coalescing identical concurrent calls (single-flight).
+
+When several Streamlit sessions ask for the same data at the same time, only the first
+caller does the work; the others wait for it and receive the same result (or exception).
+"""
+import threading
+
+
+class Call:
+    """One in-flight call that waiting callers can block on."""
+
+    def __init__(self):
+        """Create a call that hasn't finished yet."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        """Wait for the call to finish.
+
+        Returns:
+            The call's result.
+
+        Raises:
+            Exception: The exception the call raised, if any.
+        """
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Process-wide registry of in-flight calls, keyed by what they fetch."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, function):
+        """Run function, unless a call with the same key is in flight, in which case wait for its result.
+
+        Args:
+            key: Hashable key identifying the call.
+            function (callable): Function to run, called with no arguments.
+
+        Returns:
+            The result of the call.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            owner = call is None
+            if owner:
+                call = self.calls[key] = Call()
+        if not owner:
+            return call.wait()
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+    def do_many(self, keys, function):
+        """Run function for the keys nobody is fetching yet and wait for the rest.
+
+        This lets a batched fetch share work per item: a request for ten countries where
+        three are already being fetched by another session only fetches the other seven.
+
+        Args:
+            keys (list): Hashable keys identifying the items to fetch.
+            function (callable): Called with the list of keys this caller owns, returns a
+                dictionary mapping those keys to their results.
+
+        Returns:
+            dict: Dictionary mapping keys to results (keys without a result are left out).
+        """
+        owned = {}
+        waiting = {}
+        with self.lock:
+            for key in keys:
+                call = self.calls.get(key)
+                if call is None:
+                    owned[key] = self.calls[key] = Call()
+                else:
+                    waiting[key] = call
+
+        results = {}
+        if owned:
+            try:
+                results = dict(function(list(owned)))
+                for key, call in owned.items():
+                    call.result = results.get(key)
+            except Exception as error:
+                for call in owned.values():
+                    call.error = error
+                raise
+            finally:
+                with self.lock:
+                    for key in owned:
+                        del self.calls[key]
+                for call in owned.values():
+                    call.done.set()
+
+        for key, call in waiting.items():
+            result = call.wait()
+            if result is not None:
+                results[key] = result
+        return results
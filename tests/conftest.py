@@ -0,0 +1,42 @@
+"""Shared fixtures: the repository modules, an isolated cache and the fake World Bank API."""
+import os
+import sys
+import threading
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)  # the modules live at the repository root
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))  # fake_worldbank
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Point the on-disk cache at an empty database of this test."""
+    import indicator_cache
+
+    monkeypatch.setattr(indicator_cache, "CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(indicator_cache, "_local", threading.local())  # drop connections to the real cache
+    monkeypatch.setattr(indicator_cache, "OFFLINE", False)
+    return indicator_cache
+
+
+@pytest.fixture
+def fake_api(cache, monkeypatch):
+    """Serve the fake World Bank API and send data_fetcher's requests to it, without retries."""
+    import data_fetcher
+    from fake_worldbank import FakeWorldBank, start_server
+
+    api = FakeWorldBank()
+    server, base_url = start_server(api)
+    monkeypatch.setattr(data_fetcher, "API_BASE_URL", base_url)
+    monkeypatch.setattr(data_fetcher, "RETRY_TOTAL", 0)
+    monkeypatch.setattr(data_fetcher, "_session", None)
+    monkeypatch.setattr(data_fetcher.indicator_store, "STORE_DIR", os.path.join(os.path.dirname(cache.CACHE_PATH), "store"))
+    monkeypatch.setattr(data_fetcher, "_store", None)  # nothing preloaded
+    monkeypatch.setattr(data_fetcher.country_snapshot, "SNAPSHOT_PATH", os.path.join(os.path.dirname(cache.CACHE_PATH), "countries.json"))
+    data_fetcher.country_snapshot.load_listed_countries.cache_clear()  # the country list comes from this fake API
+    yield api
+    data_fetcher.country_snapshot.load_listed_countries.cache_clear()
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,86 @@
+"""Tests of the all-country panel aggregations against straightforward pandas equivalents."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregations import UNKNOWN_GROUP, Panel
+
+YEARS = np.arange(2000, 2006)
+COUNTRIES = {
+    "Aland": {"region": "North", "income_level": "High income"},
+    "Borduria": {"region": "East", "income_level": "Low income"},
+    "Carpania": {"region": "East", "income_level": "High income"},
+    "Dorne": {"region": "North", "income_level": "Low income"},
+    "Elbonia": {"region": "East"},
+    "Freedonia": {},
+}
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(3)
+    values = rng.uniform(1, 100, size=(len(COUNTRIES), len(YEARS)))
+    values[0, :2] = np.nan  # Aland starts late
+    values[4, 3] = np.nan
+    values[:, 5] = np.nan  # nobody has data in the last year
+    values[1, 2] = values[2, 2]  # a tie
+    return Panel(values, YEARS, list(COUNTRIES), COUNTRIES)
+
+
+def long_frame(panel):
+    """Flatten a panel into a long dataframe with every country's groups."""
+    frame = pd.DataFrame(panel.values, index=panel.names, columns=panel.years).stack().rename("Value").reset_index()
+    frame.columns = ["Country", "Year", "Value"]
+    for by in ("region", "income_level"):
+        frame[by] = frame["Country"].map(lambda name: COUNTRIES[name].get(by) or UNKNOWN_GROUP)
+    return frame
+
+
+def test_years_with_data(panel):
+    assert panel.years_with_data().tolist() == [2000, 2001, 2002, 2003, 2004]
+
+
+def test_rank_orders_values_and_computes_percentiles(panel):
+    ranking = panel.rank(2002)
+    column = pd.Series(panel.column(2002), index=panel.names).dropna()
+    assert ranking["Value"].tolist() == sorted(column, reverse=True)
+    assert ranking["Rank"].tolist() == list(range(1, len(column) + 1))
+    expected = [(column <= value).mean() * 100 for value in ranking["Value"]]
+    np.testing.assert_allclose(ranking["Percentile"], expected)
+    assert panel.rank(2005).empty and panel.rank(1990).empty
+
+
+def test_quantiles_match_numpy(panel):
+    quantiles = panel.quantiles(2003)
+    column = panel.column(2003)
+    np.testing.assert_allclose(quantiles["Value"], np.nanquantile(column, [0.1, 0.25, 0.5, 0.75, 0.9]))
+    assert panel.quantiles(2005).empty
+
+
+@pytest.mark.parametrize("by", ["region", "income_level"])
+def test_group_by_matches_pandas(panel, by):
+    frame = long_frame(panel)
+    frame = frame[frame["Year"] == 2003]
+    expected = frame.groupby(by)["Value"].agg(["count", "mean", "median", "min", "max", "sum"]).reset_index()
+    groups = panel.group_by(2003, by)
+    label = {"region": "Region", "income_level": "Income level"}[by]
+    assert groups[label].tolist() == expected[by].tolist()
+    assert groups["Countries"].tolist() == expected["count"].tolist()
+    for column, reference in [("Mean", "mean"), ("Median", "median"), ("Min", "min"), ("Max", "max"), ("Total", "sum")]:
+        np.testing.assert_allclose(groups[column], expected[reference])
+
+
+def test_group_trend_matches_pandas(panel):
+    trend = panel.group_trend("region").set_index("Year")
+    expected = long_frame(panel).pivot_table(index="Year", columns="region", values="Value", aggfunc="mean")
+    expected = expected.reindex(index=YEARS, columns=trend.columns)
+    np.testing.assert_allclose(trend.to_numpy(), expected.to_numpy())
+
+
+def test_growth_is_the_compound_annual_rate(panel):
+    growth = panel.growth(2001, 2004)
+    start = pd.Series(panel.column(2001), index=panel.names)
+    end = pd.Series(panel.column(2004), index=panel.names)
+    expected = (((end / start) ** (1 / 3) - 1) * 100).dropna().sort_values(ascending=False)
+    assert growth["Country"].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(growth["Growth (% per year)"], expected.to_numpy())
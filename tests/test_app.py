@@ -0,0 +1,36 @@
+"""End-to-end runs of the dashboard script through Streamlit's AppTest harness, against the fake API."""
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import REPO_ROOT
+
+APP_PATH = os.path.join(REPO_ROOT, "CountryDataExplorer.py")
+
+
+@pytest.fixture
+def app(fake_api, monkeypatch):
+    import prefetch
+
+    monkeypatch.setattr(prefetch, "PREFETCH_ENABLED", False)  # no background fetches outliving the test
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.run()
+    assert not app.exception
+    return app
+
+
+def test_selecting_countries_shows_the_map(app):
+    countries = app.multiselect[0].options[:2]
+    app.multiselect[0].select(countries[0]).select(countries[1]).run()
+    assert not app.exception, app.exception[0].message if app.exception else None
+    assert app.checkbox(key="map").value
+    assert len(app.get("deck_gl_json_chart")) == 1  # st.map got serializable points
+
+
+def test_picking_an_indicator_shows_the_charts(app):
+    app.multiselect[0].select(app.multiselect[0].options[0]).run()
+    app.button[0].click().run()
+    app.selectbox[0].select(app.selectbox[0].options[2]).run()  # options[0] is the blank placeholder
+    assert not app.exception, app.exception[0].message if app.exception else None
+    assert not app.warning or "couldn't be loaded" not in app.warning[0].value
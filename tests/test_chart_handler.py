@@ -0,0 +1,31 @@
+"""Tests of the per-session chart cache."""
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+import chart_handler
+
+
+@pytest.fixture(autouse=True)
+def empty_session():
+    st.session_state.clear()
+    yield
+    st.session_state.clear()
+
+
+def test_chart_cache_stays_bounded_while_sliders_move():
+    df = pd.DataFrame({"Year": np.arange(2000, 2020), "A": np.arange(20.0), "B": np.arange(20.0)})
+    for start_year in range(2000, 2015):
+        chart_handler.get_chart("line", df, start_year, 2019, False, data_key=("X", 1))
+        chart_handler.get_chart("bar", df, 2000, start_year + 1, False, data_key=("X", 1))
+    cache = st.session_state.chart_cache
+    assert len(cache['long']) <= chart_handler.MAX_CACHED_RANGES
+    assert sorted(cache['figures']) == ["bar", "line"]
+
+
+def test_chart_cache_reuses_the_last_figure():
+    df = pd.DataFrame({"Year": np.arange(2000, 2010), "A": np.arange(10.0)})
+    figure = chart_handler.get_chart("area", df, 2000, 2009, True, data_key=("X", 1))
+    assert chart_handler.get_chart("area", df, 2000, 2009, True, data_key=("X", 1)) is figure
+    assert chart_handler.get_chart("area", df, 2000, 2009, True, data_key=("X", 2)) is not figure
@@ -0,0 +1,26 @@
+"""Tests of where the country list comes from."""
+import numpy as np
+
+import country_snapshot
+import data_fetcher
+import indicator_store
+
+
+def test_countries_come_from_the_store_then_the_snapshot_then_the_api(fake_api, tmp_path):
+    downloaded = country_snapshot.load_countries()
+    assert downloaded
+    assert {country["id"] for country in downloaded.values()} <= {country["id"] for country in fake_api.countries}
+    assert country_snapshot.load_countries() is downloaded  # fetched once per process
+    assert fake_api.reset_stats()["requests"] == 1
+
+    country_snapshot.load_listed_countries.cache_clear()
+    country_snapshot.write_snapshot({"Aland": {"id": "ALA"}})
+    assert country_snapshot.load_countries() == {"Aland": {"id": "ALA"}}
+    assert data_fetcher.fetch_countries() == {"Aland": {"id": "ALA"}}
+
+    stored = {"Borduria": {"id": "BOR"}}
+    series = {"BOR": {"dates": np.array([2000], dtype=np.int16), "values": np.array([1.0])}}
+    indicator_store.write_store(stored, {"X": series}, ["X"])
+    assert country_snapshot.load_countries() == stored
+    assert data_fetcher.fetch_countries() == stored == data_fetcher.get_store().countries
+    assert fake_api.reset_stats()["requests"] == 0
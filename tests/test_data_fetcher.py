@@ -0,0 +1,95 @@
+"""Tests of data_fetcher's batched fetching and its cache fallback when the API can't be reached."""
+import logging
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import data_fetcher
+
+INDICATOR = "NY.GDP.PCAP.CD"
+
+
+def unreachable_url():
+    """Get an API URL nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v2"
+
+
+def country_dict(api, count):
+    """Pick countries with data from the fake API's country list."""
+    countries = [country for country in api.countries if country["region"]["id"] != "NA"][:count]
+    return {country["name"]: {"id": country["id"]} for country in countries}
+
+
+def test_fetch_indicator_data_keeps_selection_order(fake_api):
+    countries = country_dict(fake_api, 3)
+    names = list(reversed(countries))
+    indicator_data = data_fetcher.fetch_indicator_data(names, countries, INDICATOR)
+    assert list(indicator_data) == names
+    for series in indicator_data.values():
+        assert series["dates"].dtype.kind == "i"
+        assert len(series["dates"]) == len(series["values"])
+
+
+def test_unreachable_api_leaves_out_uncached_countries(fake_api, monkeypatch):
+    countries = country_dict(fake_api, 2)
+    cached, uncached = countries
+    data_fetcher.fetch_indicator_data([cached], countries, INDICATOR)
+
+    monkeypatch.setattr(data_fetcher, "API_BASE_URL", unreachable_url())
+    monkeypatch.setattr(data_fetcher.indicator_cache, "CACHE_TTL", -1)  # the cached entry is stale too
+    indicator_data = data_fetcher.fetch_indicator_data([cached, uncached], countries, INDICATOR)
+    assert list(indicator_data) == [cached]  # stale data is served, the failed country isn't faked as empty
+    assert len(indicator_data[cached]["dates"]) > 0
+
+    with pytest.raises(data_fetcher.MissingDataError) as error:
+        data_fetcher.fetch_indicator_data([cached, uncached], countries, INDICATOR, require_all=True)
+    assert error.value.country_ids == [countries[uncached]["id"]]
+
+
+def test_unreachable_api_without_cache_raises(fake_api, monkeypatch):
+    countries = country_dict(fake_api, 1)
+    monkeypatch.setattr(data_fetcher, "API_BASE_URL", unreachable_url())
+    with pytest.raises(data_fetcher.requests.RequestException):
+        data_fetcher.fetch_indicator_data(list(countries), countries, INDICATOR)
+
+
+def expected_series(api, country_id):
+    """Read a country's series straight from the fake API's rows, oldest year first."""
+    rows = [row for row in api.rows_for(INDICATOR) if row["countryiso3code"] == country_id and row["value"] is not None]
+    return sorted((int(row["date"]), row["value"]) for row in rows)
+
+
+def test_plan_batches_splits_ids_into_request_paths():
+    assert data_fetcher.plan_batches(["A", "B", "C", "D", "E"], batch_size=2) == ["A;B", "C;D", "E"]
+    assert data_fetcher.plan_batches([]) == []
+
+
+def test_download_series_follows_pagination_across_batches(fake_api, monkeypatch):
+    monkeypatch.setattr(data_fetcher, "BATCH_SIZE", 7)
+    fake_api.max_per_page = 50  # every batch spans several pages
+    country_ids = [country["id"] for country in country_dict(fake_api, 20).values()]
+    series = data_fetcher.download_series(country_ids, INDICATOR)
+    assert sorted(series) == sorted(country_ids)
+    assert fake_api.stats["requests"] > len(data_fetcher.plan_batches(country_ids))  # pages were followed
+    for country_id in country_ids:
+        dates, values = series[country_id]["dates"], series[country_id]["values"]
+        present = ~np.isnan(values)
+        got = sorted((int(year), float(value)) for year, value in zip(dates[present], values[present], strict=True))
+        assert got == expected_series(fake_api, country_id)
+
+
+def test_pool_keeps_a_connection_per_concurrent_request(fake_api, monkeypatch, caplog):
+    monkeypatch.setattr(fake_api, "latency", 0.05)  # long enough for every request to be in flight at once
+    url = f"{data_fetcher.API_BASE_URL}/country?format=json"
+    concurrency = max(data_fetcher.MAX_WORKERS, data_fetcher.API_MAX_CONCURRENCY)
+    with caplog.at_level(logging.WARNING, logger="urllib3.connectionpool"):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(lambda _: data_fetcher.get_response(url), range(concurrency)))
+    assert all(response.status_code == 200 for response in responses)
+    assert fake_api.stats["requests"] == concurrency
+    assert not [record for record in caplog.records if "pool is full" in record.getMessage()]
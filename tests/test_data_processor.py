@@ -0,0 +1,34 @@
+"""Tests of building the Year x Country table."""
+import numpy as np
+
+from data_processor import build_year_matrix, process_indicator_data
+
+
+def series(*pairs):
+    """Build a series from (year, value) pairs, newest year first like the API."""
+    return {"dates": np.array([year for year, _ in pairs], dtype=np.int16),
+            "values": np.array([value for _, value in pairs], dtype=np.float64)}
+
+
+def test_build_year_matrix_aligns_countries_on_years():
+    years, matrix = build_year_matrix({"A": series((2002, 3.0), (2000, 1.0)), "B": series((2001, 20.0))})
+    assert years.tolist() == [2000, 2001, 2002]
+    np.testing.assert_array_equal(matrix, [[1.0, np.nan], [np.nan, 20.0], [3.0, np.nan]])
+
+
+def test_process_indicator_data_keeps_numeric_values_and_trims_empty_years():
+    df, min_year, max_year, country_count = process_indicator_data({
+        "A": series((2003, np.nan), (2002, 55.5), (2001, np.nan), (2000, np.nan)),
+        "B": series((2003, np.nan), (2001, 12.25)),
+        "C": series()
+    })
+    assert (min_year, max_year, country_count) == (2001, 2002, 3)
+    assert list(df.columns) == ["Year", "A", "B", "C"]
+    assert df["Year"].tolist() == [2001, 2002]
+    assert all(df[column].dtype == np.float64 for column in ("A", "B", "C"))  # percentages are formatted at display time
+    assert df["A"].iloc[1] == 55.5 and df["B"].iloc[0] == 12.25
+
+
+def test_process_indicator_data_without_values():
+    assert process_indicator_data({}) == (None, None, None, 0)
+    assert process_indicator_data({"A": series((2000, np.nan)), "B": series()}) == (None, None, None, 2)
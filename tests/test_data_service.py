@@ -0,0 +1,76 @@
+"""Tests of the HTTP data service, called as a WSGI application."""
+import json
+from collections import OrderedDict
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+import data_service
+
+INDICATOR = "NY.GDP.PCAP.CD"  # one of the configured indicators
+
+
+@pytest.fixture
+def service(fake_api, monkeypatch):
+    monkeypatch.setattr(data_service, "_responses", OrderedDict())
+    return fake_api
+
+
+def get(path, query=""):
+    """Call the service and return (status code, headers, body)."""
+    environ = {"PATH_INFO": path, "QUERY_STRING": query}
+    setup_testing_defaults(environ)
+    response = {}
+
+    def start_response(status, headers):
+        response["status"] = int(status.split()[0])
+        response["headers"] = dict(headers)
+
+    body = b"".join(data_service.app(environ, start_response))
+    return response["status"], response["headers"], body
+
+
+def test_series_json_keeps_full_float_precision(service):
+    country_ids = [country["id"] for country in service.countries if country["region"]["id"] != "NA"][:2]
+    status, headers, body = get("/series", f"indicator={INDICATOR}&countries={';'.join(country_ids)}")
+    assert status == 200 and headers["Content-Type"] == "application/json"
+    records = json.loads(body)
+    assert {record["country_id"] for record in records} == set(country_ids)
+    expected = {(row["countryiso3code"], int(row["date"])): row["value"]
+                for row in service.rows_for(INDICATOR) if row["countryiso3code"] in country_ids}
+    for record in records:
+        assert record["value"] == expected[(record["country_id"], record["year"])]  # null for missing values
+    assert b"00000000" not in body  # no to_json rounding artifacts like 38.534100000000002
+
+
+def test_unknown_indicator_is_not_fetched(service):
+    status, _, body = get("/series", "indicator=NOT.A.CODE&countries=AAA")
+    assert status == 404 and "unknown indicator" in json.loads(body)["error"]
+    assert service.stats["requests"] == 0
+
+
+def test_unknown_country_is_a_404(service):
+    status, _, body = get("/table", f"indicator={INDICATOR}&countries=ZZZ")
+    assert status == 404 and "ZZZ" in json.loads(body)["error"]
+
+
+def test_missing_indicator_is_a_400(service):
+    assert get("/series")[0] == 400
+
+
+def test_unexpected_key_errors_are_not_404s(service, monkeypatch):
+    def broken(indicator, country_ids=None):
+        raise KeyError("bug")
+
+    monkeypatch.setattr(data_service.data_api, "get_table", broken)
+    with pytest.raises(KeyError):
+        get("/table", f"indicator={INDICATOR}")
+
+
+def test_unexpected_value_errors_are_not_400s(service, monkeypatch):
+    def broken(indicator, country_ids=None):
+        raise ValueError("Out of range float values are not JSON compliant")
+
+    monkeypatch.setattr(data_service.data_api, "get_table", broken)
+    with pytest.raises(ValueError):
+        get("/table", f"indicator={INDICATOR}")
@@ -0,0 +1,52 @@
+"""Tests of LTTB downsampling."""
+import numpy as np
+import pandas as pd
+
+from downsample import decimate_long, lttb_indices, segment_indices
+
+
+def test_lttb_keeps_the_ends_and_the_threshold():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    kept = lttb_indices(x, y, 100)
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[277] = 100.0
+    assert 277 in lttb_indices(x, y, 20)
+
+
+def test_lttb_returns_short_series_whole():
+    assert list(lttb_indices(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+    assert list(lttb_indices(np.arange(5.0), np.arange(5.0), 2)) == [0, 1, 2, 3, 4]
+
+
+def test_segments_keep_the_gap_between_them():
+    x = np.arange(400, dtype=np.float64)
+    y = np.cos(x / 10)
+    y[150:200] = np.nan
+    kept = segment_indices(x, y, 40)
+    assert 150 in kept  # the line breaks at the gap
+    assert not np.isnan(y[kept[kept != 150]]).any()
+    assert {0, 149, 200, 399} <= set(kept.tolist())
+    assert len(kept) <= 45
+
+
+def test_decimate_long_downsamples_each_series():
+    years = np.arange(1000)
+    long_df = pd.DataFrame({
+        "Year": np.concatenate([years, years]),
+        "Country": ["A"] * 1000 + ["B"] * 1000,
+        "Value": np.concatenate([np.sin(years / 30), np.where(years % 300 < 10, np.nan, years * 1.0)])
+    })
+    decimated = decimate_long(long_df, 50)
+    counts = decimated.groupby("Country").size()
+    assert counts["A"] == 50
+    assert counts["B"] <= 60
+    b_values = decimated[decimated["Country"] == "B"]["Value"]
+    assert b_values.isna().sum() == 3  # one break per gap after the leading one
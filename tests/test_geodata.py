@@ -0,0 +1,29 @@
+"""Tests of the geodata table's map points."""
+import json
+
+import numpy as np
+
+from geodata import GeoTable
+
+COUNTRIES = {
+    "Aland": {"id": "ALA", "latitude": "60.1", "longitude": "19.9", "region": "Europe"},
+    "Borduria": {"id": "BOR", "latitude": "", "longitude": ""},
+    "Carpania": {"id": "CAR", "latitude": "-12.5", "longitude": "130.8", "income_level": "High income"},
+}
+
+
+def test_points_follow_the_selection_and_skip_missing_coordinates():
+    points = GeoTable(COUNTRIES).points(["Carpania", "Borduria", "Nowhere", "Aland"])
+    np.testing.assert_allclose(points.to_numpy(), [[-12.5, 130.8], [60.1, 19.9]], rtol=1e-6)
+
+
+def test_points_are_json_serializable_floats():
+    points = GeoTable(COUNTRIES).points(["Aland"])
+    assert list(points.dtypes) == [np.float64, np.float64]
+    json.dumps(points.to_dict(orient="list"))  # float32 values would raise TypeError
+
+
+def test_frame_fills_missing_metadata():
+    frame = GeoTable(COUNTRIES).frame()
+    assert frame["Region"].tolist() == ["Europe", "Unknown", "Unknown"]
+    assert frame["Income level"].tolist() == ["Unknown", "Unknown", "High income"]
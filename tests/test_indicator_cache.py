@@ -0,0 +1,68 @@
+"""Tests of the on-disk indicator cache: storage, TTL, ETag revalidation and offline mode."""
+import numpy as np
+
+import data_fetcher
+from test_data_fetcher import INDICATOR, country_dict, unreachable_url
+
+
+def series(*pairs):
+    """Build a series from (year, value) pairs."""
+    return {"dates": np.array([year for year, _ in pairs], dtype=np.int16),
+            "values": np.array([value for _, value in pairs], dtype=np.float64)}
+
+
+def test_entries_round_trip(cache):
+    cache.put_entries("X", {"ALA": series((2001, 1.5), (2000, np.nan)), "BOR": series()},
+                      source_url="http://api/x", etag='"abc"')
+    entries = cache.get_entries("X", ["ALA", "BOR", "CAR"])
+    assert sorted(entries) == ["ALA", "BOR"]
+    assert entries["ALA"]["dates"].dtype == np.int16
+    assert entries["ALA"]["dates"].tolist() == [2001, 2000]
+    assert entries["ALA"]["values"][0] == 1.5 and np.isnan(entries["ALA"]["values"][1])
+    assert len(entries["BOR"]["dates"]) == 0
+    assert entries["ALA"]["etag"] == '"abc"'
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    cache.put_entries("X", {"ALA": series((2000, 1.0))})
+    entry = cache.get_entries("X", ["ALA"])["ALA"]
+    assert cache.is_fresh(entry)
+    assert not cache.is_fresh(entry, now=entry["fetched_at"] + cache.CACHE_TTL)
+    cache.touch_entries("X", ["ALA"])
+    assert cache.get_entries("X", ["ALA"])["ALA"]["fetched_at"] >= entry["fetched_at"]
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    cache.put_entries("X", {"ALA": series((2000, 1.0))})
+    cache.put_entries("X", {"BOR": series((2000, 2.0))})
+    cache.get_entries("X", ["ALA"])  # ALA is now the most recently used
+    monkeypatch.setattr(cache, "CACHE_MAX_ENTRIES", 1)
+    cache.evict()
+    assert list(cache.get_entries("X", ["ALA", "BOR"])) == ["ALA"]
+
+
+def test_stale_entries_are_revalidated_with_their_etag(fake_api, monkeypatch):
+    countries = country_dict(fake_api, 2)
+    first = data_fetcher.fetch_indicator_data(list(countries), countries, INDICATOR)
+    fake_api.reset_stats()
+
+    monkeypatch.setattr(data_fetcher.indicator_cache, "CACHE_TTL", -1)
+    second = data_fetcher.fetch_indicator_data(list(countries), countries, INDICATOR)
+    stats = fake_api.reset_stats()
+    assert stats["requests"] == 1 and stats["not_modified"] == 1  # one conditional request for the shared batch
+    for country in countries:
+        np.testing.assert_array_equal(first[country]["values"], second[country]["values"])
+
+
+def test_offline_mode_serves_the_cache_without_calling_the_api(fake_api, monkeypatch):
+    countries = country_dict(fake_api, 2)
+    cached, uncached = countries
+    data_fetcher.fetch_indicator_data([cached], countries, INDICATOR)
+    fake_api.reset_stats()
+
+    monkeypatch.setattr(data_fetcher.indicator_cache, "OFFLINE", True)
+    monkeypatch.setattr(data_fetcher.indicator_cache, "CACHE_TTL", -1)
+    monkeypatch.setattr(data_fetcher, "API_BASE_URL", unreachable_url())
+    indicator_data = data_fetcher.fetch_indicator_data([cached, uncached], countries, INDICATOR)
+    assert list(indicator_data) == [cached]
+    assert fake_api.reset_stats()["requests"] == 0
@@ -0,0 +1,73 @@
+"""Tests of the incremental indicator table: failed fetches and stale columns."""
+import numpy as np
+import streamlit as st
+
+import indicator_pipeline
+
+COUNTRIES = {"Aland": {"id": "ALA"}, "Borduria": {"id": "BOR"}, "Carpania": {"id": "CAR"}}
+
+
+def series(*pairs):
+    """Build a series from (year, value) pairs."""
+    return {"dates": np.array([year for year, _ in pairs], dtype=np.int16),
+            "values": np.array([value for _, value in pairs], dtype=np.float64)}
+
+
+def test_failed_countries_get_no_column_and_are_fetched_again(monkeypatch):
+    available = {"Aland": series((2001, 1.0), (2000, 2.0)), "Borduria": series()}
+    calls = []
+
+    def fake_fetch(selected_countries, countries_dict, indicator):
+        calls.append(list(selected_countries))
+        return {country: available[country] for country in selected_countries if country in available}
+
+    monkeypatch.setattr(indicator_pipeline, "fetch_indicator_data", fake_fetch)
+    state = indicator_pipeline.new_state()
+    missing = indicator_pipeline.splice_countries(state, list(COUNTRIES), COUNTRIES, "X")
+    assert missing == ["Carpania"]
+    assert "Carpania" not in state["bounds"]
+    assert list(state["frame"].columns) == ["Aland", "Borduria"]
+
+    df, min_year, max_year, country_count = indicator_pipeline.trim_frame(state, list(COUNTRIES))
+    assert (min_year, max_year, country_count) == (2000, 2001, 3)
+    assert list(df.columns) == ["Year", "Aland", "Borduria"]
+
+    # once the API is back, only the failed country is fetched
+    available["Carpania"] = series((2002, 3.0))
+    added = [country for country in COUNTRIES if country not in state["bounds"]]
+    assert indicator_pipeline.splice_countries(state, added, COUNTRIES, "X") == []
+    assert calls[-1] == ["Carpania"]
+    assert indicator_pipeline.trim_frame(state, list(COUNTRIES))[1:] == (2000, 2002, 3)
+    assert state["bounds"]["Carpania"] == (2002, 2002)
+
+
+def test_columns_are_fetched_again_after_the_cache_ttl_or_a_new_store(monkeypatch):
+    calls = []
+
+    def fake_fetch(selected_countries, countries_dict, indicator):
+        calls.append(list(selected_countries))
+        return {country: series((2000, float(len(calls)))) for country in selected_countries}
+
+    store_version = ["v1"]
+    monkeypatch.setattr(indicator_pipeline, "fetch_indicator_data", fake_fetch)
+    monkeypatch.setattr(indicator_pipeline, "get_cube", lambda: None)
+    monkeypatch.setattr(indicator_pipeline, "get_store_version", lambda: store_version[0])
+    monkeypatch.setattr(indicator_pipeline.indicator_cache, "CACHE_TTL", 60)
+    monkeypatch.setitem(st.session_state, "indicator_frames", {})
+    selected = ["Aland", "Borduria"]
+
+    indicator_pipeline.load_indicator_frame(selected, COUNTRIES, "X")
+    indicator_pipeline.load_indicator_frame(selected, COUNTRIES, "X")
+    assert calls == [selected]  # a fresh state is reused
+    first_key = indicator_pipeline.get_data_key("X")
+
+    # a dashboard left open past the TTL fetches every column again
+    st.session_state["indicator_frames"]["X"]["built_at"] -= 61
+    df = indicator_pipeline.load_indicator_frame(selected, COUNTRIES, "X")[0]
+    assert calls == [selected, selected]
+    assert df["Aland"].tolist() == [2.0]
+    assert indicator_pipeline.get_data_key("X") != first_key  # charts of the old data aren't reused
+
+    store_version[0] = "v2"
+    indicator_pipeline.load_indicator_frame(selected, COUNTRIES, "X")
+    assert calls == [selected, selected, selected]
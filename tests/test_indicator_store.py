@@ -0,0 +1,49 @@
+"""Tests of the versioned store and of reloading it after a new ingestion."""
+import numpy as np
+
+import data_fetcher
+import indicator_store
+
+COUNTRIES = {"Aland": {"id": "ALA"}, "Borduria": {"id": "BOR"}}
+
+
+def write(store_dir, value):
+    """Write a store with one indicator whose series all hold one value in 2000."""
+    series = {country["id"]: {"dates": np.array([2000], dtype=np.int16), "values": np.array([value])}
+              for country in COUNTRIES.values()}
+    return indicator_store.write_store(COUNTRIES, {"X": series}, ["X"], store_dir=str(store_dir))
+
+
+def test_write_store_switches_versions_and_keeps_the_previous_one(tmp_path):
+    assert indicator_store.load_store(str(tmp_path)) is None
+    write(tmp_path, 1.0)
+    first = indicator_store.load_store(str(tmp_path))
+    write(tmp_path, 2.0)
+    second = indicator_store.load_store(str(tmp_path))
+    assert second.version != first.version
+    assert second.indicator_data(["Aland"], "X")["Aland"]["values"][0] == 2.0
+    assert first.indicator_data(["Aland"], "X")["Aland"]["values"][0] == 1.0  # still readable
+
+    write(tmp_path, 3.0)
+    versions = sorted(path.name for path in tmp_path.iterdir() if path.is_dir())
+    assert len(versions) == indicator_store.KEEP_VERSIONS
+    assert first.version not in versions
+    assert indicator_store.current_version(str(tmp_path)) == versions[-1]
+
+
+def test_get_store_reloads_after_a_new_ingestion(tmp_path, monkeypatch):
+    monkeypatch.setattr(indicator_store, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(data_fetcher, "_store", None)
+    assert data_fetcher.get_store() is None
+
+    write(tmp_path, 1.0)
+    store = data_fetcher.get_store()
+    assert data_fetcher.get_store() is store  # loaded once per version
+    assert data_fetcher.fetch_countries() == COUNTRIES
+
+    write(tmp_path, 2.0)
+    reloaded = data_fetcher.get_store()
+    assert reloaded is not store
+    assert data_fetcher.get_store_version() == reloaded.version
+    cube = data_fetcher.get_cube()
+    assert cube.values[cube.indicator_index["X"], 0, 0] == 2.0
@@ -0,0 +1,34 @@
+"""Tests of the Prometheus exposition."""
+import instrumentation
+
+
+def test_label_values_are_escaped(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    monkeypatch.setattr(instrumentation, "_counters", {})
+    monkeypatch.setattr(instrumentation, "_histograms", {})
+    instrumentation.increment("requests_total", path='C:\\data "x"\nnext')
+    page = instrumentation.render_prometheus()
+    assert 'countrydata_requests_total{path="C:\\\\data \\"x\\"\\nnext"} 1' in page
+
+
+def test_histogram_buckets_are_cumulative(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    monkeypatch.setattr(instrumentation, "_counters", {})
+    monkeypatch.setattr(instrumentation, "_histograms", {})
+    for value in (0.002, 0.02, 20.0):
+        instrumentation.observe("stage_seconds", value, stage="fetch")
+    page = instrumentation.render_prometheus()
+    assert 'countrydata_stage_seconds_bucket{stage="fetch",le="0.005"} 1' in page
+    assert 'countrydata_stage_seconds_bucket{stage="fetch",le="+Inf"} 3' in page
+    assert 'countrydata_stage_seconds_count{stage="fetch"} 3' in page
+
+
+def test_metrics_server_listens_on_localhost_by_default(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    monkeypatch.setattr(instrumentation, "_server", None)
+    server = instrumentation.start_metrics_server(port="0")  # any free port
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,27 @@
+"""Tests of the prefetcher's failure handling."""
+import logging
+import threading
+
+import prefetch
+
+
+def test_failed_prefetch_is_logged_counted_and_released(monkeypatch, caplog):
+    def failing_fetch(country_ids, indicator):
+        raise RuntimeError("API down")
+
+    counted = []
+    monkeypatch.setattr(prefetch, "needs_fetch", lambda country_ids, indicator: list(country_ids))
+    monkeypatch.setattr(prefetch, "fetch_series_by_id", failing_fetch)
+    monkeypatch.setattr(prefetch.instrumentation, "increment", lambda name, amount=1, **labels: counted.append(name))
+    with caplog.at_level(logging.DEBUG, logger="prefetch"):
+        prefetch.prefetch_job(["ALA", "BOR"], "X", threading.Event())
+    assert "prefetch_failures_total" in counted
+    assert "prefetch of X failed" in caplog.text
+    assert not prefetch._in_flight
+
+
+def test_cancelled_job_does_nothing(monkeypatch):
+    monkeypatch.setattr(prefetch, "needs_fetch", lambda country_ids, indicator: 1 / 0)
+    cancelled = threading.Event()
+    cancelled.set()
+    prefetch.prefetch_job(["ALA"], "X", cancelled)
@@ -0,0 +1,114 @@
+"""Tests of the typed-array response parser against a plain json.loads reading of the same bodies."""
+import json
+
+import numpy as np
+import pytest
+
+import response_parser
+from fake_worldbank import paginate, synthetic_countries, synthetic_indicator_rows
+from response_parser import ResponseError, merge_pages, parse_indicator_response, split_series
+
+PARSERS = [
+    "json",
+    pytest.param("orjson", marks=pytest.mark.skipif(response_parser.orjson is None, reason="orjson isn't installed")),
+    pytest.param("ijson", marks=pytest.mark.skipif(response_parser.ijson is None, reason="ijson isn't installed")),
+]
+
+
+@pytest.fixture(params=PARSERS)
+def parser(request, monkeypatch):
+    monkeypatch.setattr(response_parser, "PARSER", request.param)
+    return request.param
+
+
+def row(country_id, year, value):
+    """Build an API row with the fields the parser reads and a few it ignores."""
+    return {"indicator": {"id": "X", "value": "X"}, "country": {"id": country_id[:2], "value": country_id},
+            "countryiso3code": country_id, "date": str(year), "value": value, "unit": "", "decimal": 1}
+
+
+def body(metadata, rows):
+    """Encode a response body."""
+    return json.dumps([metadata, rows]).encode("utf-8")
+
+
+def expected(body_bytes):
+    """Read a body with json.loads into {country id: sorted [(year, value)]}, NaN as None."""
+    data = json.loads(body_bytes)
+    series = {}
+    for item in data[1] or []:
+        series.setdefault(item["countryiso3code"], []).append((int(item["date"]), item["value"]))
+    return {country_id: sorted(pairs) for country_id, pairs in series.items()}
+
+
+def parsed(bodies):
+    """Parse and merge pages, then convert the series to the shape of expected()."""
+    runs, years, values = merge_pages([parse_indicator_response(page) for page in bodies])
+    return {
+        country_id: sorted((int(year), None if np.isnan(value) else float(value))
+                           for year, value in zip(series["dates"], series["values"], strict=True))
+        for country_id, series in split_series(runs, years, values).items()
+    }
+
+
+def fake_pages(per_page):
+    """Build every page of a synthetic multi-country response."""
+    countries = [country for country in synthetic_countries() if country["region"]["id"] != "NA"][:5]
+    rows = synthetic_indicator_rows("NY.GDP.MKTP.KD.ZG", countries)
+    pages = []
+    page = 1
+    while True:
+        pages.append(json.dumps(paginate(rows, {"per_page": [str(per_page)], "page": [str(page)]}, None)).encode())
+        if page >= json.loads(pages[-1])[0]["pages"]:
+            return pages, rows
+        page += 1
+
+
+def test_paginated_response_matches_json(parser):
+    pages, rows = fake_pages(per_page=47)  # pages end in the middle of countries
+    assert len(pages) > 2
+    assert parsed(pages) == expected(json.dumps([{}, rows]).encode())
+    metadata = parse_indicator_response(pages[1])[0]
+    assert metadata["page"] == 2 and metadata["pages"] == len(pages)
+
+
+def test_non_contiguous_rows_are_joined(parser):
+    rows = [row("AAA", 2002, 1.0), row("BBB", 2002, 5.0), row("AAA", 2001, None), row("AAA", 2000, 3.5)]
+    page = body({"page": 1, "pages": 1, "per_page": 50, "total": 4}, rows)
+    assert parsed([page]) == expected(page)
+
+
+@pytest.mark.parametrize("total", [1, 3, 1000])
+def test_inconsistent_metadata_is_sized_from_the_rows(parser, total):
+    rows = [row("AAA", year, float(year)) for year in range(2000, 2003)]
+    page = body({"page": 1, "pages": 1, "per_page": 50, "total": total}, rows)
+    assert parsed([page]) == expected(page)
+
+
+@pytest.mark.parametrize("rows", [None, []])
+def test_empty_response(parser, rows):
+    page = body({"page": 1, "pages": 0, "per_page": 50, "total": 0}, rows)
+    metadata, runs, years, values = parse_indicator_response(page)
+    assert metadata["total"] == 0 and runs == []
+    assert years.dtype == np.int16 and values.dtype == np.float64 and len(years) == len(values) == 0
+
+
+def test_error_payload_raises(parser):
+    page = json.dumps([{"message": [{"id": "120", "key": "Invalid value",
+                                     "value": "The provided parameter value is not valid"}]}]).encode()
+    with pytest.raises(ResponseError, match="Invalid value"):
+        parse_indicator_response(page)
+
+
+@pytest.mark.parametrize("page", [
+    b'[{"page": 1, "pages": 1, "per_page": 50, "total": 2}, [{"countryiso3code": "AAA", "date": "20',
+    b"",
+    b"{}",
+    b"[]",
+    b'"text"',
+    b'[{"page": 1}, [{"countryiso3code": "AAA", "date": "2000", "value": "abc"}]]',
+    b'[{"page": 1}, [{"countryiso3code": "AAA", "value": 1}]]',
+])
+def test_malformed_response_raises(parser, page):
+    with pytest.raises(ResponseError):
+        parse_indicator_response(page)
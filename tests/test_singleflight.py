@@ -0,0 +1,81 @@
+"""Tests of coalescing concurrent calls."""
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    """Run target on count threads started together and collect what they return or raise."""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as error:
+            results[i] = error
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_do_runs_the_function_once_for_concurrent_callers():
+    flights = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    assert run_concurrently(8, lambda: flights.do("key", slow)) == ["result"] * 8
+    assert len(calls) == 1
+    assert not flights.calls
+
+
+def test_do_shares_the_exception_and_forgets_the_call():
+    flights = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    results = run_concurrently(4, lambda: flights.do("key", failing))
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.do("key", lambda: "retried") == "retried"  # a failed call isn't cached
+
+
+def test_do_many_only_fetches_keys_nobody_else_is_fetching():
+    flights = SingleFlight()
+    requested = []
+    started = threading.Event()
+
+    def fetch(keys):
+        requested.append(sorted(keys))
+        started.set()
+        time.sleep(0.1)
+        return {key: key.upper() for key in keys if key != "c"}  # "c" has no result
+
+    first = threading.Thread(target=lambda: flights.do_many(["a", "b"], fetch))
+    first.start()
+    started.wait()
+    results = flights.do_many(["a", "b", "c"], fetch)
+    first.join()
+    assert requested == [["a", "b"], ["c"]]
+    assert results == {"a": "A", "b": "B"}
+    assert not flights.calls
+
+
+def test_do_many_propagates_the_owner_error():
+    flights = SingleFlight()
+    with pytest.raises(RuntimeError):
+        flights.do_many(["a"], lambda keys: (_ for _ in ()).throw(RuntimeError("down")))
+    assert not flights.calls
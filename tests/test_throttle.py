@@ -0,0 +1,47 @@
+"""Tests of the token bucket."""
+import threading
+import time
+
+from throttle import TokenBucket
+
+
+def test_burst_is_served_immediately():
+    bucket = TokenBucket(rate=1, capacity=5)
+    start = time.monotonic()
+    assert all(bucket.acquire() for _ in range(5))
+    assert time.monotonic() - start < 0.1
+
+
+def test_empty_bucket_times_out():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire()
+    start = time.monotonic()
+    assert not bucket.acquire(timeout=0.05)
+    assert time.monotonic() - start < 0.5
+
+
+def test_tokens_refill_at_the_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    assert bucket.acquire()
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert 0.01 < time.monotonic() - start < 0.5
+
+
+def test_requests_larger_than_the_capacity_are_capped():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.acquire(tokens=10, timeout=0)
+
+
+def test_concurrent_callers_share_the_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    bucket.acquire()
+    taken = []
+    threads = [threading.Thread(target=lambda: taken.append(bucket.acquire(timeout=2))) for _ in range(10)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert taken == [True] * 10
+    assert time.monotonic() - start >= 0.08  # 10 tokens at 100 per second
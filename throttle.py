@@ -0,0 +1,52 @@
+"""Module for rate limiting calls to the World Bank API."""
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: allows bursts of `capacity` calls and `rate` calls per second on average."""
+
+    def __init__(self, rate, capacity):
+        """Create a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens (the burst size).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        """Add the tokens earned since the last update (the lock must be held)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """Take tokens from the bucket, waiting until enough are available.
+
+        Args:
+            tokens (float): Number of tokens to take (capped at the capacity).
+            timeout (float): Maximum number of seconds to wait, None waits forever.
+
+        Returns:
+            bool: True if the tokens were taken, False if the timeout ran out first.
+        """
+        tokens = min(tokens, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self.refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)